@@ -2,54 +2,94 @@ import os
 import sys
 import argparse
 import decimal
+import queue
+import re
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import pyodbc
 from config_reader import ConfigReader
 from path_manager import PathManager
 
-# Define all datasets in one place for easy extension
+# Rows pulled per fetchmany() call when a dataset is loaded in streaming mode
+DEFAULT_CHUNK_SIZE = 50000
+
+# Source connections opened at once when loading datasets in parallel
+DEFAULT_WORKERS = 4
+
+# Per-table load bookkeeping (watermarks for incremental refreshes)
+METADATA_TABLE = 'load_metadata'
+
+# Define all datasets in one place for easy extension.
+# 'chunk_size' (optional) overrides DEFAULT_CHUNK_SIZE for streaming loads.
+# 'primary_key' (optional) lists the columns that identify a row, enabling --incremental.
+# 'change_column' (optional) is a column that grows whenever a source row changes;
+# once a watermark is stored, incremental loads only fetch source rows at or above it
+# (the column may only be day-granular) or without a value, see incremental_query.
+# Rows deleted at the source are then only dropped by a full load.
+# 'indexes' (optional) lists column groups to index once the table is loaded;
+# they should cover the lookups and joins used by the downstream queries.
 DATASETS = [
     {
         'key': 'items',
         'query_key': 'dancik_items_query',
-        'table_key': 'dancik_items_table'
+        'table_key': 'dancik_items_table',
+        'primary_key': ['itemNumber'],
+        'indexes': [['itemNumber']],
+        'chunk_size': 20000
     },
     {
         'key': 'billto',
         'query_key': 'dancik_billto_query',
-        'table_key': 'dancik_billto_table'
+        'table_key': 'dancik_billto_table',
+        'primary_key': ['schemaName', 'accountNumber'],
+        'indexes': [['schemaName', 'accountNumber']]
     },
     {
         'key': 'price',
         'query_key': 'dancik_price_query',
-        'table_key': 'dancik_price_table'
+        'table_key': 'dancik_price_table',
+        'primary_key': ['schemaName', 'PRCCD', 'LIST_NUM'],
+        'change_column': 'LCHDT',
+        'indexes': [['PRCCD', 'LIST_NUM', 'schemaName']]
     },
     {
         'key': 'rolls',
         'query_key': 'dancik_rolls_query',
-        'table_key': 'dancik_rolls_table'
+        'table_key': 'dancik_rolls_table',
+        'primary_key': ['schemaName', 'itemNumber', 'RWARE#', 'RROLL#', 'RLOC1'],
+        'indexes': [['itemNumber'], ['schemaName', 'itemNumber']],
+        'chunk_size': 100000
     },
     # Warehouse tables
     {
         'key': 'wm0002f',
         'query_key': 'dancik_wm0002f_query',
-        'table_key': 'dancik_wm0002f_table'
+        'table_key': 'dancik_wm0002f_table',
+        'primary_key': ['schemaName', 'W2WARE', 'W2AREA'],
+        'indexes': [['schemaName', 'W2WARE', 'W2AREA']]
     },
     {
         'key': 'wm0003f',
         'query_key': 'dancik_wm0003f_query',
-        'table_key': 'dancik_wm0003f_table'
+        'table_key': 'dancik_wm0003f_table',
+        'primary_key': ['schemaName', 'W3WARE', 'W3SUBAREA'],
+        'indexes': [['schemaName', 'W3WARE', 'W3SUBAREA']]
     },
     {
         'key': 'wm0005f',
         'query_key': 'dancik_wm0005f_query',
-        'table_key': 'dancik_wm0005f_table'
+        'table_key': 'dancik_wm0005f_table',
+        'primary_key': ['schemaName', 'W5WARE', 'W5LOCTMP'],
+        'indexes': [['schemaName', 'W5WARE', 'W5LOCTMP']]
     },
     {
         'key': 'wm0006f',
         'query_key': 'dancik_wm0006f_query',
-        'table_key': 'dancik_wm0006f_table'
+        'table_key': 'dancik_wm0006f_table',
+        'primary_key': ['schemaName', 'W6WARE', 'W6LOCID'],
+        'indexes': [['schemaName', 'W6WARE', 'W6LOCID']]
     }
 ]
 
@@ -83,52 +123,130 @@ def connect_source():
     return pyodbc.connect(conn_str)
 
 
-def fetch_data(query_path):
+# Marker a dataset query can hold to place the incremental condition itself,
+# e.g. when its last SELECT already has a WHERE: "... WHERE x = 1 AND {change_filter}"
+CHANGE_FILTER_MARKER = "{change_filter}"
+
+
+def incremental_query(sql, source_filter=None):
+    """
+    Narrow a dataset query to the rows an incremental load needs.
+    :param source_filter: (change_column, watermark), or None for every row.
+    :return: (sql, params) for cursor.execute.
+    """
+    if source_filter is None:
+        return sql.replace(CHANGE_FILTER_MARKER, "1 = 1"), ()
+    change_column, watermark = source_filter
+    condition = f'("{change_column}" >= ? OR "{change_column}" IS NULL)'
+    if CHANGE_FILTER_MARKER in sql:
+        return sql.replace(CHANGE_FILTER_MARKER, condition), (watermark,)
+    return f"{sql.strip().rstrip(';')}\nWHERE {condition}", (watermark,)
+
+
+def fetch_data(query_path, source_filter=None):
     """
     Execute the SQL query at query_path and return as a DataFrame.
+    source_filter narrows it for an incremental load, see incremental_query.
     """
     print(f"Reading query from {query_path}")
     with open(query_path, "r") as f:
-        sql = f.read()
+        sql, params = incremental_query(f.read(), source_filter)
     conn = connect_source()
     cursor = conn.cursor()
-    print("Executing query...")
-    cursor.execute(sql)
+    print("Executing query..." if source_filter is None else f"Executing query ({source_filter[0]} >= {source_filter[1]!r})...")
+    cursor.execute(sql, *params)
     cols = [col[0] for col in cursor.description]
+    types = [col[1] for col in cursor.description]
     rows = cursor.fetchall()
     cursor.close()
     conn.close()
     df = pd.DataFrame([tuple(r) for r in rows], columns=cols)
+    return apply_column_types(df, types)
+
+
+def fetch_data_chunks(query_path, chunk_size=DEFAULT_CHUNK_SIZE, source_filter=None):
+    """
+    Execute the SQL query at query_path and yield the result as DataFrames
+    of at most chunk_size rows, so only one chunk is held in memory at a time.
+    source_filter narrows it for an incremental load, see incremental_query.
+    """
+    print(f"Reading query from {query_path}")
+    with open(query_path, "r") as f:
+        sql, params = incremental_query(f.read(), source_filter)
+    conn = connect_source()
+    cursor = conn.cursor()
+    try:
+        print(f"Executing query (streaming, {chunk_size} rows per chunk)...")
+        cursor.execute(sql, *params)
+        cols = [col[0] for col in cursor.description]
+        types = [col[1] for col in cursor.description]
+        yielded = False
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yielded = True
+            yield apply_column_types(pd.DataFrame([tuple(r) for r in rows], columns=cols), types)
+        if not yielded:
+            # Still hand back the column layout so the table is recreated empty
+            yield pd.DataFrame(columns=cols)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def apply_column_types(df, types):
+    """
+    Convert numeric columns once per column using the type codes from
+    cursor.description, instead of checking every cell.
+    Decimal and float columns become float64 (matching the old per-cell
+    float() conversion); int columns become int64, or nullable Int64 when
+    they contain NULLs. String, date and other columns are left untouched.
+    """
+    for i, type_code in enumerate(types):
+        if type_code in (decimal.Decimal, float):
+            df.isetitem(i, df.iloc[:, i].astype('float64'))
+        elif type_code is int:
+            col = df.iloc[:, i]
+            df.isetitem(i, col.astype('Int64' if col.isna().any() else 'int64'))
     return df
 
 
-def save_to_sqlite(df, table, db_path, ask_confirm):
+def confirm_overwrite(conn, table, db_path, ask_confirm):
     """
-    Save DataFrame to a SQLite table, optionally confirming per-table overwrite.
-    Converts Decimal to str for compatibility.
+    Return False if the table exists and the user declines to overwrite it.
     """
-    # Convert decimals
-    df = df.apply(lambda col: col.map(lambda x: float(x) if isinstance(x, decimal.Decimal) else x))
+    if not ask_confirm:
+        return True
 
-    # Ensure DB directory exists
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
-
-    # Check if table exists
     cursor.execute(
         "SELECT name FROM sqlite_master WHERE type='table' AND name=?;",
         (table,)
     )
     exists = cursor.fetchone() is not None
 
-    # Prompt if requested and table already exists
-    if exists and ask_confirm:
+    if exists:
         resp = input(f"⚠️ Table '{table}' exists in {db_path}. Overwrite? (y/n): ")
         if resp.lower() != 'y':
             print(f"Skipping load for table '{table}'.")
-            conn.close()
-            return
+            return False
+    return True
+
+
+def save_to_sqlite(df, table, db_path, ask_confirm):
+    """
+    Save DataFrame to a SQLite table, optionally confirming per-table overwrite.
+    Numeric columns are expected to be typed already (see apply_column_types).
+    """
+    # Ensure DB directory exists
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+
+    # Prompt if requested and table already exists
+    if not confirm_overwrite(conn, table, db_path, ask_confirm):
+        conn.close()
+        return
 
     # Write (will replace if_exists='replace')
     df.to_sql(table, conn, if_exists='replace', index=False)
@@ -136,6 +254,394 @@ def save_to_sqlite(df, table, db_path, ask_confirm):
     print(f"✅ Loaded DataFrame into SQLite table '{table}'")
 
 
+def write_chunk(conn, table, df, first):
+    """
+    Write one chunk into the staging table for `table` and commit it.
+    The first chunk recreates the staging table, later chunks append.
+    """
+    df.to_sql(f"{table}__loading", conn, if_exists='replace' if first else 'append', index=False)
+    conn.commit()
+
+
+def swap_in_staging(conn, table):
+    """
+    Replace `table` with its fully written staging table.
+    """
+    conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+    conn.execute(f'ALTER TABLE "{table}__loading" RENAME TO "{table}"')
+    conn.commit()
+
+
+def drop_staging(conn, table):
+    conn.execute(f'DROP TABLE IF EXISTS "{table}__loading"')
+    conn.commit()
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def ensure_metadata_table(conn):
+    # watermark is left untyped so it keeps the storage class of the change column
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {METADATA_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            watermark,
+            row_count INTEGER,
+            last_loaded TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def get_watermark(conn, table):
+    ensure_metadata_table(conn)
+    row = conn.execute(
+        f"SELECT watermark FROM {METADATA_TABLE} WHERE table_name = ?", (table,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def record_load(conn, table, change_column=None):
+    """
+    Store the row count and, if the dataset has a change column, the new
+    watermark for `table` in the metadata table.
+    """
+    ensure_metadata_table(conn)
+    row_count = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    watermark = None
+    if change_column:
+        watermark = conn.execute(f'SELECT MAX("{change_column}") FROM "{table}"').fetchone()[0]
+    conn.execute(f"""
+        INSERT OR REPLACE INTO {METADATA_TABLE} (table_name, watermark, row_count, last_loaded)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    """, (table, watermark, row_count))
+    conn.commit()
+
+
+def merge_staging(conn, table, primary_key, partial=False):
+    """
+    Apply the difference between the staging table and `table` in place.
+    Every key whose rows were added, changed or removed is deleted from
+    `table` and re-inserted from staging; untouched rows are never rewritten.
+    With partial=True staging only holds the rows fetched above the watermark
+    (see incremental_query): their keys are updated, and keys missing from
+    staging are left alone instead of being taken as removed.
+    Returns (rows_deleted, rows_inserted).
+    """
+    staging = f"{table}__loading"
+    keys = ", ".join(f'"{k}"' for k in primary_key)
+    match_target = " AND ".join(f'k."{c}" IS t."{c}"' for c in primary_key)
+
+    conn.execute(f'CREATE INDEX IF NOT EXISTS "{index_name(table, primary_key)}" ON "{table}" ({keys})')
+    conn.execute(f'CREATE INDEX "ix_{staging}__pk" ON "{staging}" ({keys})')
+
+    if partial:
+        # Only the fetched rows can have changed; rows fetched unchanged are skipped
+        changed_sql = f"""
+            SELECT {keys} FROM (SELECT * FROM "{staging}" EXCEPT SELECT * FROM "{table}")
+        """
+    else:
+        changed_sql = f"""
+            SELECT {keys} FROM (SELECT * FROM "{staging}" EXCEPT SELECT * FROM "{table}")
+            UNION
+            SELECT {keys} FROM (SELECT * FROM "{table}" EXCEPT SELECT * FROM "{staging}")
+        """
+
+    conn.execute("DROP TABLE IF EXISTS temp.changed_keys")
+    conn.execute(f"CREATE TEMP TABLE changed_keys AS {changed_sql}")
+    conn.execute(f"CREATE INDEX temp.ix_changed_keys ON changed_keys ({keys})")
+
+    deleted = conn.execute(f"""
+        DELETE FROM "{table}" AS t
+         WHERE EXISTS (SELECT 1 FROM temp.changed_keys AS k WHERE {match_target})
+    """).rowcount
+    inserted = conn.execute(f"""
+        INSERT INTO "{table}"
+        SELECT t.* FROM "{staging}" AS t
+         WHERE EXISTS (SELECT 1 FROM temp.changed_keys AS k WHERE {match_target})
+    """).rowcount
+    conn.execute("DROP TABLE temp.changed_keys")
+    conn.commit()
+    return deleted, inserted
+
+
+def finalize_staging(conn, table, primary_key=None, change_column=None, partial=False):
+    """
+    Publish a fully written staging table. With a primary_key and an existing
+    table of the same shape, only the differences are merged; otherwise the
+    table is replaced wholesale. A partial extract (see merge_staging) can
+    only be merged. The load is recorded in the metadata table.
+    Returns a short description of what was done.
+    """
+    staging = f"{table}__loading"
+    same_shape = table_columns(conn, table) == table_columns(conn, staging)
+    if partial and not same_shape:
+        raise ValueError(f"Columns of '{table}' changed; reload it without --incremental")
+    if primary_key and same_shape:
+        deleted, inserted = merge_staging(conn, table, primary_key, partial)
+        drop_staging(conn, table)
+        summary = f"incremental: {deleted} rows removed, {inserted} rows written"
+    else:
+        swap_in_staging(conn, table)
+        summary = "full replace"
+    record_load(conn, table, change_column)
+    return summary
+
+
+def save_chunks_to_sqlite(chunks, table, db_path, ask_confirm, primary_key=None, change_column=None,
+                          partial=False):
+    """
+    Stream an iterable of DataFrame chunks into a SQLite table.
+    The first chunk replaces the table, later chunks are appended and
+    committed as they arrive. The table is only swapped in once the
+    whole stream has been written, so a failed load leaves the old data intact.
+    Passing a primary_key merges only changed rows into the existing table;
+    partial marks chunks fetched above the watermark, see finalize_staging.
+    """
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+
+    if not confirm_overwrite(conn, table, db_path, ask_confirm):
+        conn.close()
+        return
+
+    total = 0
+    try:
+        for i, chunk in enumerate(chunks):
+            write_chunk(conn, table, chunk, first=(i == 0))
+            total += len(chunk)
+            print(f"   • {table}: {total} rows written")
+        summary = finalize_staging(conn, table, primary_key, change_column, partial)
+    finally:
+        drop_staging(conn, table)
+        conn.close()
+    print(f"✅ Streamed {total} rows into SQLite table '{table}' ({summary})")
+
+
+class SQLiteWriter:
+    """
+    Single thread that owns the SQLite connection during a parallel load.
+    Loader threads hand it DataFrame chunks through a bounded queue, so the
+    database file is only ever written from one place and fetches block
+    (instead of piling up in memory) when the writer falls behind.
+    """
+
+    def __init__(self, db_path, max_pending=8):
+        self.db_path = db_path
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.errors = {}
+        self.thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def put_chunk(self, table, df):
+        self.queue.put(('chunk', table, df))
+
+    def finish_table(self, table, primary_key=None, change_column=None, partial=False):
+        self.queue.put(('done', table, (primary_key, change_column, partial)))
+
+    def abort_table(self, table):
+        self.queue.put(('abort', table, None))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        totals = {}
+        while True:
+            msg = self.queue.get()
+            if msg is None:
+                break
+            action, table, payload = msg
+            if table in self.errors:
+                continue
+            try:
+                if action == 'chunk':
+                    write_chunk(conn, table, payload, first=(table not in totals))
+                    totals[table] = totals.get(table, 0) + len(payload)
+                    print(f"   • {table}: {totals[table]} rows written")
+                elif action == 'done':
+                    summary = finalize_staging(conn, table, *payload)
+                    print(f"✅ Loaded {totals.get(table, 0)} rows into SQLite table '{table}' ({summary})")
+                elif action == 'abort':
+                    drop_staging(conn, table)
+            except Exception as e:
+                print(f"❌ Error writing table '{table}': {e}")
+                self.errors[table] = e
+                drop_staging(conn, table)
+        conn.close()
+
+
+def index_name(table, columns):
+    return f"ix_{table}_" + "_".join(re.sub(r'\W', '', c) for c in columns)
+
+
+def build_indexes(db_path, datasets):
+    """
+    Create the indexes declared in each dataset's 'indexes' entry.
+    Tables that have not been loaded yet are skipped.
+    """
+    config = ConfigReader.get_instance()
+    conn = sqlite3.connect(db_path)
+    try:
+        for ds in datasets:
+            tbl = config.get('DB', ds['table_key'])
+            if not table_columns(conn, tbl):
+                continue
+            for columns in ds.get('indexes', []):
+                name = index_name(tbl, columns)
+                cols = ", ".join(f'"{c}"' for c in columns)
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{tbl}" ({cols})')
+                print(f"   • Index {name} ready")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def analyze_database(db_path):
+    """
+    Refresh SQLite's planner statistics so the new indexes get used.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"✅ ANALYZE completed on {db_path}")
+
+
+def load_dataset(ds, db_path, ask_confirm, stream=False, chunk_size=None, incremental=False):
+    """
+    Extract one entry of DATASETS from the source DB and write it to SQLite.
+    In streaming mode rows are fetched with fetchmany() and written per chunk.
+    In incremental mode only new, changed and vanished rows touch the table,
+    and a dataset with a stored watermark only fetches rows above it.
+    """
+    config = ConfigReader.get_instance()
+    qpath = config.get('QUERIES', ds['query_key'])
+    tbl = config.get('DB', ds['table_key'])
+
+    # Ask before anything is fetched from the source
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        if not confirm_overwrite(conn, tbl, db_path, ask_confirm):
+            return
+        primary_key, change_column = _merge_settings(ds, incremental)
+        source_filter = _source_filter(conn, tbl, primary_key, change_column)
+    finally:
+        conn.close()
+
+    if not (stream or incremental):
+        df = fetch_data(qpath)
+        save_to_sqlite(df, tbl, db_path, ask_confirm=False)
+    else:
+        if stream:
+            size = chunk_size or ds.get('chunk_size', DEFAULT_CHUNK_SIZE)
+            chunks = fetch_data_chunks(qpath, size, source_filter)
+        else:
+            chunks = [fetch_data(qpath, source_filter)]
+        save_chunks_to_sqlite(chunks, tbl, db_path, False, primary_key, change_column,
+                              partial=source_filter is not None)
+    build_indexes(db_path, [ds])
+
+
+def _merge_settings(ds, incremental):
+    if not incremental:
+        return None, None
+    if not ds.get('primary_key'):
+        print(f"⚠️ Dataset '{ds['key']}' has no primary_key; doing a full reload.")
+        return None, None
+    return ds['primary_key'], ds.get('change_column')
+
+
+def _source_filter(conn, table, primary_key, change_column):
+    """
+    (change_column, watermark) to narrow the source query with, or None to
+    fetch every row: the first load, or datasets without a change_column.
+    """
+    if not (primary_key and change_column) or not table_columns(conn, table):
+        return None
+    watermark = get_watermark(conn, table)
+    return None if watermark is None else (change_column, watermark)
+
+
+def _fetch_into_writer(ds, writer, stream, chunk_size, source_filter=None, merge_settings=(None, None)):
+    """
+    Worker body for load_datasets_parallel: pull one dataset from the source
+    DB and pass it to the shared SQLiteWriter.
+    """
+    config = ConfigReader.get_instance()
+    qpath = config.get('QUERIES', ds['query_key'])
+    tbl = config.get('DB', ds['table_key'])
+    try:
+        if stream:
+            size = chunk_size or ds.get('chunk_size', DEFAULT_CHUNK_SIZE)
+            chunks = fetch_data_chunks(qpath, size, source_filter)
+        else:
+            chunks = [fetch_data(qpath, source_filter)]
+        for chunk in chunks:
+            writer.put_chunk(tbl, chunk)
+    except Exception:
+        writer.abort_table(tbl)
+        raise
+    writer.finish_table(tbl, *merge_settings, partial=source_filter is not None)
+
+
+def load_datasets_parallel(datasets, db_path, ask_confirm, workers=DEFAULT_WORKERS, stream=False, chunk_size=None,
+                           incremental=False):
+    """
+    Fetch several DATASETS concurrently with at most `workers` source
+    connections open, funnelling every write through one SQLiteWriter.
+    Returns a dict of dataset key -> exception for the loads that failed.
+    """
+    config = ConfigReader.get_instance()
+
+    # Overwrite prompts and watermark lookups have to happen before the workers start
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    selected = []
+    for ds in datasets:
+        tbl = config.get('DB', ds['table_key'])
+        if confirm_overwrite(conn, tbl, db_path, ask_confirm):
+            merge_settings = _merge_settings(ds, incremental)
+            selected.append((ds, _source_filter(conn, tbl, *merge_settings), merge_settings))
+    conn.close()
+
+    failures = {}
+    writer = SQLiteWriter(db_path)
+    writer.start()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_fetch_into_writer, ds, writer, stream, chunk_size, source_filter, merge_settings): ds
+                for ds, source_filter, merge_settings in selected
+            }
+            for future in as_completed(futures):
+                ds = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"❌ Error loading dataset '{ds['key']}': {e}")
+                    failures[ds['key']] = e
+    finally:
+        writer.close()
+
+    for ds, _, _ in selected:
+        tbl = config.get('DB', ds['table_key'])
+        if tbl in writer.errors:
+            failures.setdefault(ds['key'], writer.errors[tbl])
+
+    # Indexes are built once the writer is done, so they never compete with loads
+    build_indexes(db_path, [ds for ds, _, _ in selected if ds['key'] not in failures])
+    return failures
+
+
 def interactive_menu(options):
     """
     Display a menu and return the chosen key, or None to exit.
@@ -156,7 +662,6 @@ def interactive_menu(options):
 
 
 def main():
-    config = ConfigReader.get_instance()
     pm = PathManager()
     db_path = pm.get_path('PATHS', 'db_path')
 
@@ -171,41 +676,67 @@ def main():
                         help='Which dataset to load')
     parser.add_argument('-c', '--confirm', action='store_true',
                         help='Ask before overwriting existing tables')
+    parser.add_argument('-s', '--stream', action='store_true',
+                        help='Fetch and write rows in chunks to keep memory bounded')
+    parser.add_argument('--chunk-size', type=int,
+                        help='Rows per chunk in streaming mode (overrides the per-dataset setting)')
+    parser.add_argument('-p', '--parallel', action='store_true',
+                        help="Fetch datasets concurrently when loading 'all'")
+    parser.add_argument('-w', '--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Maximum concurrent source connections in parallel mode (default {DEFAULT_WORKERS})')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='Only apply new, changed and removed rows to existing tables; datasets with a '
+                             'change_column only fetch rows from their stored watermark on')
+    parser.add_argument('-a', '--analyze', action='store_true',
+                        help='Build any missing indexes and run ANALYZE (after loading, if --load is given)')
     args = parser.parse_args()
 
+    def load(tgt):
+        ds = next(d for d in DATASETS if d['key'] == tgt)
+        load_dataset(ds, db_path, ask_confirm=args.confirm, stream=args.stream,
+                     chunk_size=args.chunk_size, incremental=args.incremental)
+
+    def load_all():
+        if not args.parallel:
+            for tgt in keys[:-1]:
+                load(tgt)
+            return True
+        failures = load_datasets_parallel(DATASETS, db_path, ask_confirm=args.confirm,
+                                          workers=args.workers, stream=args.stream,
+                                          chunk_size=args.chunk_size, incremental=args.incremental)
+        return not failures
+
+    def analyze():
+        build_indexes(db_path, DATASETS)
+        analyze_database(db_path)
+
     # Determine mode: interactive or single-run
-    if args.load:
-        targets = keys[:-1] if args.load == 'all' else [args.load]
-        for tgt in targets:
-            ds = next(d for d in DATASETS if d['key'] == tgt)
-            qpath = config.get('QUERIES', ds['query_key'])
-            tbl   = config.get('DB', ds['table_key'])
-            df    = fetch_data(qpath)
-            save_to_sqlite(df, tbl, db_path, ask_confirm=args.confirm)
-        print('✅ All tasks completed.')
-        sys.exit(0)
-
-        # Interactive loop
+    if args.load or args.analyze:
+        ok = True
+        if args.load == 'all':
+            ok = load_all()
+        elif args.load:
+            load(args.load)
+        if args.analyze:
+            analyze()
+        print('✅ All tasks completed.' if ok else '⚠️ Completed with errors.')
+        sys.exit(0 if ok else 1)
+
+    # Interactive loop
     while True:
-        choice = interactive_menu(keys)
+        choice = interactive_menu(keys + ['analyze'])
         if not choice:
             print('Exiting.')
             break
+        if choice == 'analyze':
+            analyze()
+            continue
         if choice == 'all':
-            for tgt in keys[:-1]:
-                ds = next(d for d in DATASETS if d['key'] == tgt)
-                qpath = config.get('QUERIES', ds['query_key'])
-                tbl = config.get('DB', ds['table_key'])
-                df = fetch_data(qpath)
-                save_to_sqlite(df, tbl, db_path, ask_confirm=args.confirm)
-            print('✅ All datasets loaded.')
+            ok = load_all()
+            print('✅ All datasets loaded.' if ok else '⚠️ Some datasets failed to load.')
             continue
 
-        ds = next(d for d in DATASETS if d['key'] == choice)
-        qpath = config.get('QUERIES', ds['query_key'])
-        tbl = config.get('DB', ds['table_key'])
-        df = fetch_data(qpath)
-        save_to_sqlite(df, tbl, db_path, ask_confirm=args.confirm)
+        load(choice)
 
     print('Goodbye.')
 
@@ -0,0 +1,143 @@
+import argparse
+import hashlib
+from decimal import Decimal
+from dancik_uom import UOMServiceFactory
+from database import Database
+
+# One row per (conversion graph, from, to); items with identical package data share a graph
+GRAPH_TABLE = "uom_conversion_graphs"
+# itemNumber -> graph, plus the signature used to detect changed package data
+ITEM_TABLE = "uom_factor_items"
+# Joinable per-item view over the two tables above
+FACTOR_VIEW = "uom_factors"
+
+# (from, to) pairs UOMService.convert_price returns unconverted
+PRICE_PASSTHROUGH = {("IN", "SY")}
+
+
+def ensure_tables(db):
+    db.execute(f"""
+        CREATE TABLE IF NOT EXISTS {GRAPH_TABLE} (
+            graph_id TEXT NOT NULL,
+            from_uom TEXT NOT NULL,
+            to_uom TEXT NOT NULL,
+            factor REAL,
+            price_factor REAL,
+            steps TEXT,
+            PRIMARY KEY (graph_id, from_uom, to_uom)
+        )
+    """)
+    db.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ITEM_TABLE} (
+            itemNumber TEXT PRIMARY KEY,
+            graph_id TEXT NOT NULL,
+            signature TEXT NOT NULL,
+            LastUpdated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    db.execute(f"CREATE INDEX IF NOT EXISTS ix_{ITEM_TABLE}_graph_id ON {ITEM_TABLE} (graph_id)")
+    db.execute(f"""
+        CREATE VIEW IF NOT EXISTS {FACTOR_VIEW} AS
+        SELECT i.itemNumber, g.from_uom, g.to_uom, g.factor, g.price_factor, g.steps
+          FROM {ITEM_TABLE} i
+          JOIN {GRAPH_TABLE} g ON g.graph_id = i.graph_id
+    """)
+
+
+def graph_rows(graph_id, paths):
+    """
+    Flatten a service's conversion paths into table rows.
+    `factor` is the product of the steps, for SQL joins on quantities
+    (quantity * factor). `price_factor` is what prices are divided by
+    (price / price_factor); it equals `factor` except where
+    UOMService.convert_price passes prices through unchanged (IN -> SY), where
+    it is 1. `steps` keeps the exact Decimal factor of every step, so
+    UOMService quantity results can be reproduced exactly.
+    """
+    rows = []
+    for from_uom, targets in paths.items():
+        for to_uom, steps in targets.items():
+            if from_uom == to_uom:
+                continue
+            factor = Decimal("1")
+            for _, _, step_factor in steps:
+                factor *= step_factor
+            price_factor = Decimal("1") if (from_uom, to_uom) in PRICE_PASSTHROUGH else factor
+            rows.append((
+                graph_id, from_uom, to_uom, float(factor), float(price_factor),
+                " ".join(str(step_factor) for _, _, step_factor in steps)
+            ))
+    return rows
+
+
+def build_uom_factors(full_rebuild=False):
+    """
+    Materialize conversion factors for every item in dancik_items.
+    Only items whose package data changed since the last build are rewritten.
+    """
+    factory = UOMServiceFactory()
+
+    signatures = {}
+    services = {}
+    for item_number in factory.item_details:
+        service = factory.get(item_number)
+        signatures[item_number] = repr(service.graph_signature())
+        services[item_number] = service
+
+    with Database() as db:
+        # Tables from before price_factor existed are rebuilt in full
+        columns = {row["name"] for row in db.execute(f"PRAGMA table_info({GRAPH_TABLE})").fetchall()}
+        if full_rebuild or (columns and "price_factor" not in columns):
+            db.execute(f"DROP VIEW IF EXISTS {FACTOR_VIEW}")
+            db.execute(f"DROP TABLE IF EXISTS {ITEM_TABLE}")
+            db.execute(f"DROP TABLE IF EXISTS {GRAPH_TABLE}")
+        ensure_tables(db)
+
+        existing = {
+            row["itemNumber"]: row["signature"]
+            for row in db.execute(f"SELECT itemNumber, signature FROM {ITEM_TABLE}").fetchall()
+        }
+        known_graphs = {
+            row["graph_id"]
+            for row in db.execute(f"SELECT DISTINCT graph_id FROM {GRAPH_TABLE}").fetchall()
+        }
+
+        changed = [i for i, sig in signatures.items() if existing.get(i) != sig]
+        removed = [i for i in existing if i not in signatures]
+
+        new_graph_rows = []
+        item_rows = []
+        for item_number in changed:
+            signature = signatures[item_number]
+            graph_id = hashlib.sha1(signature.encode("utf-8")).hexdigest()[:16]
+            if graph_id not in known_graphs:
+                new_graph_rows.extend(graph_rows(graph_id, services[item_number].paths))
+                known_graphs.add(graph_id)
+            item_rows.append((item_number, graph_id, signature))
+
+        db.cursor.executemany(f"DELETE FROM {ITEM_TABLE} WHERE itemNumber = ?", [(i,) for i in removed])
+        db.cursor.executemany(f"INSERT OR REPLACE INTO {GRAPH_TABLE} VALUES (?, ?, ?, ?, ?, ?)", new_graph_rows)
+        db.cursor.executemany(f"""
+            INSERT OR REPLACE INTO {ITEM_TABLE} (itemNumber, graph_id, signature, LastUpdated)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        """, item_rows)
+
+        # Drop graphs no item points at any more
+        db.execute(f"DELETE FROM {GRAPH_TABLE} WHERE graph_id NOT IN (SELECT graph_id FROM {ITEM_TABLE})")
+
+    print(f"✅ {FACTOR_VIEW}: {len(changed)} items rebuilt, {len(removed)} removed, "
+          f"{len(signatures) - len(changed)} unchanged")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Precompute UOM conversion factors for every item into migration.db'
+    )
+    parser.add_argument('-f', '--full', action='store_true',
+                        help='Rebuild every item instead of only the ones whose package data changed')
+    args = parser.parse_args()
+    build_uom_factors(full_rebuild=args.full)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,10 +2,12 @@ from ftplib import error_perm
 
 import pandas as pd
 
-from dancik_uom import UOMService
+from dancik_uom import UOMServiceFactory
 from database import Database
+from excel_helper import StreamingExcelWriter
 from query_loader import QueryLoader
 from path_manager import PathManager
+from stage_store import save_stage
 
 
 def get_basic_uom(row):
@@ -33,58 +35,59 @@ def export_inventory_to_excel():
     with Database() as db:
         df = db.fetch_dataframe(sql_query)
 
-    converted_rows = []
-    error_rows = []
-
-    for _, row in df.iterrows():
-        item_number = row["itemNumber"]
-        rum = row["RUM"]
-        cost = row["RLASTC"]
-        onhand = row["RONHAN"]
-        cost_uom = row["IUNITC"]
-        basic_uom = get_basic_uom(row)
-
-        uom_service = UOMService(item_number)
-
-        if cost_uom == "CT" and uom_service.has_uom("SF"):
-            cost_uom = "SF"
-
-
-        if cost_uom and rum and onhand is not None:
-            try:
-                converted_qty = uom_service.convert(onhand, rum, cost_uom)
-                converted_cost = uom_service.convert_price(cost, rum, cost_uom)
-                basic_uom_qty = uom_service.convert(onhand, rum, basic_uom)
-                row["RONHAN"] = converted_qty
-                row["RUM"] = cost_uom
-                row["RLASTC"] = converted_cost
-                row["basic_uom"] = basic_uom
-                row["basic_uom_qty"] = basic_uom_qty
-                converted_rows.append(row)
-            except Exception as e:
-                print(f"Error converting UOM for item {item_number}: {e}")
-                row["onhand_converted"] = onhand
-                row["cost_uom"] = rum
-                row["cost_converted"] = cost
-                error_rows.append(row)
-        else:
-            row["onhand_converted"] = onhand
-            row["cost_uom"] = rum
-            row["cost_converted"] = cost
-            error_rows.append(row)
-
-
+    # Load package data for every item in the export in one pass
+    uom_factory = UOMServiceFactory(df["itemNumber"].unique())
+
+    basic_uoms = [get_basic_uom(row) for row in df.itertuples(index=False)]
+
+    # Costs recorded per carton are converted per square foot when the item has SF
+    cost_uoms = [
+        "SF" if cost_uom == "CT" and uom_factory.get(item_number).has_uom("SF") else cost_uom
+        for item_number, cost_uom in zip(df["itemNumber"], df["IUNITC"])
+    ]
+    convertible = pd.Series([
+        bool(cost_uom) and bool(rum) and onhand is not None
+        for cost_uom, rum, onhand in zip(cost_uoms, df["RUM"], df["RONHAN"])
+    ], index=df.index)
+
+    todo = df[convertible]
+    to_cost = uom_factory.convert_columns(
+        todo["itemNumber"], todo["RUM"], pd.Series(cost_uoms, index=df.index)[convertible],
+        quantities=todo["RONHAN"], prices=todo["RLASTC"]
+    )
+    to_basic = uom_factory.convert_columns(
+        todo["itemNumber"], todo["RUM"], pd.Series(basic_uoms, index=df.index)[convertible],
+        quantities=todo["RONHAN"]
+    )
+    failed = to_cost["error"] | to_basic["error"]
+    for item_number, message in zip(todo["itemNumber"][failed], to_cost["error_message"].fillna(to_basic["error_message"])[failed]):
+        print(f"Error converting UOM for item {item_number}: {message}")
+
+    ok = todo.index[~failed]
+    converted_df = df.loc[ok].copy()
+    converted_df["RONHAN"] = to_cost.loc[ok, "quantity"]
+    converted_df["RUM"] = pd.Series(cost_uoms, index=df.index)[ok]
+    converted_df["RLASTC"] = to_cost.loc[ok, "price"]
+    converted_df["basic_uom"] = pd.Series(basic_uoms, index=df.index)[ok]
+    converted_df["basic_uom_qty"] = to_basic.loc[ok, "quantity"]
+
+    error_df = df.drop(index=ok).copy()
+    error_df["onhand_converted"] = error_df["RONHAN"]
+    error_df["cost_uom"] = error_df["RUM"]
+    error_df["cost_converted"] = error_df["RLASTC"]
 
     # Save to Excel
-    output_df = pd.DataFrame(converted_rows)
-    output_df.to_excel(output_path, index=False, engine="openpyxl")
-    print(f"✅ Exported {len(output_df)} rows to {output_path}")
+    with StreamingExcelWriter(output_path, autosize=True) as writer:
+        writer.append_frame(converted_df)
+    # Typed copy for 2010_inventory_classificaiton.py, so it can skip re-parsing the workbook
+    save_stage("inventory", prefix, converted_df)
+    print(f"✅ Exported {len(converted_df)} rows to {output_path}")
 
-    if error_rows:
-        error_df = pd.DataFrame(error_rows)
+    if not error_df.empty:
         error_path = path_manager.get_path("PATHS", "inventory_export_path", suffix="error")
-        error_df.to_excel(error_path, index=False, engine="openpyxl")
-        print(f"⚠️ Exported {len(error_rows)} rows with errors to {error_path}")
+        with StreamingExcelWriter(error_path, autosize=True) as writer:
+            writer.append_frame(error_df)
+        print(f"⚠️ Exported {len(error_df)} rows with errors to {error_path}")
 
 
 
@@ -1,10 +1,32 @@
+import os
 import pandas as pd
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from decimal import Decimal
-from dancik_uom import UOMService
+from dancik_uom import UOMServiceFactory
 from database import Database
+from excel_helper import StreamingExcelWriter, WIDTH_SAMPLE_ROWS
 from query_loader import QueryLoader
 from path_manager import PathManager
+from stage_store import StageWriter
+
+# Rows sent to a worker per task; large enough that pickling overhead is noise
+CHUNK_SIZE = 2000
+
+# Set once per worker process by init_worker
+_uom_factory = None
+
+
+def init_worker(item_numbers):
+    """
+    Preload package data and conversion graphs once per worker process.
+    """
+    global _uom_factory
+    _uom_factory = UOMServiceFactory(item_numbers)
+
+
+def process_rows(rows):
+    return [process_row(row) for row in rows]
 
 
 def process_row(row_dict):
@@ -14,7 +36,7 @@ def process_row(row_dict):
         cost = row_dict["RLASTC"]
         onhand = row_dict["RONHAN"]
         cost_uom = row_dict["IUNITC"]
-        uom_service = UOMService(item_number)
+        uom_service = _uom_factory.get(item_number)
 
         if cost_uom == "CT" and uom_service.has_uom("SF"):
             cost_uom = "SF"
@@ -52,25 +74,45 @@ def export_inventory_to_excel_parallel():
         df = db.fetch_dataframe(sql_query)
 
     rows = df.to_dict(orient="records")
-    results = []
-
-    with ProcessPoolExecutor() as executor:
-        futures = [executor.submit(process_row, row) for row in rows]
-
-        for future in as_completed(futures):
-            results.append(future.result())
-
-    # Separate success and error rows
-    converted_rows = [r for r in results if r.get("error") is None]
-    error_rows = [r for r in results if r.get("error") is not None]
-
-    pd.DataFrame(converted_rows).to_excel(output_path, index=False, engine="openpyxl")
-    print(f"✅ Exported {len(converted_rows)} rows to {output_path}")
-
-    if error_rows:
-        error_path = path_manager.get_path("PATHS", "inventory_export_path", suffix="error")
-        pd.DataFrame(error_rows).to_excel(error_path, index=False, engine="openpyxl")
-        print(f"⚠️ Exported {len(error_rows)} rows with errors to {error_path}")
+    batches = [rows[i:i + CHUNK_SIZE] for i in range(0, len(rows), CHUNK_SIZE)]
+    item_numbers = df["itemNumber"].unique().tolist()
+    error_path = path_manager.get_path("PATHS", "inventory_export_path", suffix="error")
+    error_writer = None
+    converted_count = 0
+    error_count = 0
+
+    # map() hands back batches in submission order, so the output keeps the
+    # bwl_inventory.sql sort order; each batch is streamed straight to the
+    # workbook instead of being collected first
+    workers = min(os.cpu_count() or 1, max(len(batches), 1))
+    # The typed stage copy lets 2010_inventory_classificaiton.py skip re-parsing the workbook
+    # Columns are sized from the first WIDTH_SAMPLE_ROWS rows, which the writers hold back until then.
+    # The error workbook is only created once a batch has errors; the ExitStack closes it with the
+    # others, or discards it if the export fails
+    with StageWriter("inventory", prefix) as stage, \
+            StreamingExcelWriter(output_path, autosize=True, autosize_rows=WIDTH_SAMPLE_ROWS) as writer, \
+            ExitStack() as error_stack, \
+            ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(item_numbers,)) as executor:
+        for batch_result in executor.map(process_rows, batches):
+            # Separate success and error rows
+            converted_rows = [r for r in batch_result if r.get("error") is None]
+            error_rows = [r for r in batch_result if r.get("error") is not None]
+
+            writer.append_records(converted_rows)
+            stage.append_records(converted_rows)
+            converted_count += len(converted_rows)
+
+            if error_rows:
+                if error_writer is None:
+                    error_writer = error_stack.enter_context(
+                        StreamingExcelWriter(error_path, autosize=True, autosize_rows=WIDTH_SAMPLE_ROWS))
+                error_writer.append_records(error_rows)
+                error_count += len(error_rows)
+
+    print(f"✅ Exported {converted_count} rows to {output_path}")
+
+    if error_writer is not None:
+        print(f"⚠️ Exported {error_count} rows with errors to {error_path}")
 
 
 if __name__ == "__main__":
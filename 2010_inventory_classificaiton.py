@@ -1,7 +1,9 @@
 import pandas as pd
 from database import Database
+from excel_helper import StreamingExcelWriter
 from path_manager import PathManager
 from config_reader import ConfigReader
+from stage_store import load_stage, load_workbook_as_stage, save_stage
 
 # === ItemType → Category Mapping ===
 ITEMTYPE_CATEGORY_MAP = {
@@ -18,6 +20,35 @@ ITEMTYPE_CATEGORY_MAP = {
     "VCT": "Shade Controlled",
 }
 
+def item_key(value):
+    """
+    Item number as stripped text, so the lookup matches whichever way it was
+    read: text from the stage, int (or float, when the column has blanks)
+    from the Excel fallback or item_hierarchy.
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def load_inventory(input_path, suffix):
+    """
+    The inventory export: the typed stage written by 2000_inventory_prep, or
+    the spreadsheet when it is newer than the stage (e.g. a hand-edited
+    export). The spreadsheet is read with the column types recorded for the
+    stage, so RWARE# '01' stays '01' on both paths; it is only left to
+    pandas' type inference when no stage was ever written.
+    """
+    stage = load_stage("inventory", suffix, newer_than=input_path)
+    if stage is None:
+        stage = load_workbook_as_stage("inventory", suffix, input_path)
+    if stage is not None:
+        return next(iter(stage.values()))
+    return pd.read_excel(input_path, engine="openpyxl")
+
+
 # === Main Function ===
 def classify_inventory():
     # Prompt for suffix
@@ -31,44 +62,41 @@ def classify_inventory():
     output_path = path_manager.get_path("PATHS", "inventory_classified_path", suffix=suffix)
 
 
-    # Read input spreadsheet
-    df = pd.read_excel(input_path, engine="openpyxl")
-
-    # Prepare category buckets
-    categories = {
-        "Average Costed": [],
-        "Roll Goods": [],
-        "Shade Controlled": [],
-        "Non Lot Controlled": []
-    }
-
-    with Database() as db:
-        for _, row in df.iterrows():
-            item_number = row["itemNumber"]
-
-            try:
-                result = db.execute(
-                    "SELECT ItemType FROM item_hierarchy WHERE H_ITEMNUMBER = ?",
-                    (item_number,)
-                ).fetchone()
-                item_type = result["ItemType"] if result else None
-            except Exception as e:
-                print(f"⚠️ DB error for item {item_number}: {e}")
-                item_type = None
-
-            category = ITEMTYPE_CATEGORY_MAP.get(item_type, "Non Lot Controlled")
-            categories[category].append(row)
-
-        # Save to Excel with 4 sorted sheets
-        with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-            for sheet, rows in categories.items():
-                if rows:
-                    df_sheet = pd.DataFrame(rows)
-                    df_sheet = df_sheet.sort_values(
-                        by=["RWARE#", "itemNumber", "RROLL#", "RLOC1", "RLRCTD"],
-                        na_position="last"
-                    )
-                    df_sheet.to_excel(writer, sheet_name=sheet, index=False)
+    df = load_inventory(input_path, suffix)
+
+    # Sheet order of the classified workbook
+    categories = ["Average Costed", "Roll Goods", "Shade Controlled", "Non Lot Controlled"]
+
+    # One lookup for every item instead of a query per row; the first
+    # hierarchy row per item wins, as fetchone() did
+    with Database(read_only=True) as db:
+        try:
+            hierarchy = db.fetch_dataframe("SELECT H_ITEMNUMBER, ItemType FROM item_hierarchy")
+        except Exception as e:
+            print(f"⚠️ DB error reading item_hierarchy: {e}")
+            hierarchy = pd.DataFrame(columns=["H_ITEMNUMBER", "ItemType"])
+    hierarchy = hierarchy.assign(H_ITEMNUMBER=hierarchy["H_ITEMNUMBER"].map(item_key))
+    item_types = hierarchy.drop_duplicates("H_ITEMNUMBER").set_index("H_ITEMNUMBER")["ItemType"]
+
+    category = (
+        df["itemNumber"].map(item_key).map(item_types)
+        .map(ITEMTYPE_CATEGORY_MAP)
+        .fillna("Non Lot Controlled")
+    )
+
+    # Save to Excel with 4 sorted sheets, plus a typed copy for the 2020 scripts
+    sheets = {}
+    groups = dict(list(df.groupby(category, sort=False)))
+    with StreamingExcelWriter(output_path, autosize=True) as writer:
+        for sheet in categories:
+            if sheet in groups:
+                df_sheet = groups[sheet].sort_values(
+                    by=["RWARE#", "itemNumber", "RROLL#", "RLOC1", "RLRCTD"],
+                    na_position="last"
+                )
+                writer.append_frame(df_sheet, sheet_name=sheet)
+                sheets[sheet] = df_sheet
+    save_stage("inventory_classified", suffix, sheets)
 
     print(f"✅ Classified inventory saved to: {output_path}")
 
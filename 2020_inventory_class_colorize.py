@@ -1,10 +1,21 @@
 import pandas as pd
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import PatternFill
+from openpyxl.formatting.rule import FormulaRule
 from openpyxl import load_workbook
+from excel_helper import apply_column_widths, worksheet_column_widths
 from path_manager import PathManager
 
-def autosize_and_shade_roll_groups(file_path):
+# Hidden helper column numbering RROLL# groups for the conditional-formatting rule
+SHADE_GROUP_COLUMN = "shadeGroup"
+
+def autosize_and_shade_roll_groups(file_path, shading="conditional", sample_rows=None):
+    """
+    :param shading: "conditional" numbers the RROLL# groups in a hidden helper
+                    column and shades odd groups with one conditional-formatting
+                    rule; "fill" writes a PatternFill on every cell of shaded rows.
+    :param sample_rows: Size columns from this many sampled rows instead of every row.
+    """
     fill_gray = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
     wb = load_workbook(file_path)
 
@@ -12,10 +23,7 @@ def autosize_and_shade_roll_groups(file_path):
         ws = wb[sheet_name]
 
         # === Autosize columns ===
-        for col in ws.columns:
-            max_length = max((len(str(cell.value)) for cell in col if cell.value), default=0)
-            col_letter = get_column_letter(col[0].column)
-            ws.column_dimensions[col_letter].width = max_length + 2
+        apply_column_widths(ws, worksheet_column_widths(ws, sample_rows=sample_rows))
 
         # === Find RROLL# column ===
         roll_col_index = next((i for i, cell in enumerate(ws[1], 1) if str(cell.value).strip().upper() == 'RROLL#'), None)
@@ -25,18 +33,34 @@ def autosize_and_shade_roll_groups(file_path):
 
         # === Apply shading on change of RROLL# ===
         last_roll = None
-        fill_toggle = False
+        group = 0
+        last_col = ws.max_column
+        max_row = ws.max_row
+        shade_col_index = last_col + 1
 
-        for row in range(2, ws.max_row + 1):
+        for row in range(2, max_row + 1):
             current_roll = ws.cell(row=row, column=roll_col_index).value
 
             if current_roll != last_roll:
-                fill_toggle = not fill_toggle
+                group += 1
                 last_roll = current_roll
 
-            if fill_toggle:
-                for col in range(1, ws.max_column + 1):
-                    ws.cell(row=row, column=col).fill = fill_gray
+            if shading == "fill":
+                # Odd groups get the gray band
+                if group % 2 == 1:
+                    for col in range(1, last_col + 1):
+                        ws.cell(row=row, column=col).fill = fill_gray
+            else:
+                ws.cell(row=row, column=shade_col_index, value=group)
+
+        if shading != "fill" and max_row > 1:
+            shade_letter = get_column_letter(shade_col_index)
+            ws.cell(row=1, column=shade_col_index, value=SHADE_GROUP_COLUMN)
+            ws.column_dimensions[shade_letter].hidden = True
+            ws.conditional_formatting.add(
+                f"A2:{shade_letter}{max_row}",
+                FormulaRule(formula=[f"MOD(${shade_letter}2,2)=1"], fill=fill_gray, stopIfTrue=True)
+            )
 
         ws.freeze_panes = 'A2'
 
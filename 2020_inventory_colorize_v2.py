@@ -1,11 +1,11 @@
 import pandas as pd
-from openpyxl.utils import get_column_letter
 from openpyxl.styles import PatternFill
 from openpyxl import load_workbook
+from excel_helper import apply_column_widths, worksheet_column_widths
 from path_manager import PathManager
 from collections import defaultdict
 
-def autosize_and_shade_roll_groups(file_path):
+def autosize_and_shade_roll_groups(file_path, sample_rows=None):
     fill_gray = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
     fill_red = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
     wb = load_workbook(file_path)
@@ -14,10 +14,7 @@ def autosize_and_shade_roll_groups(file_path):
         ws = wb[sheet_name]
 
         # === Autosize columns ===
-        for col in ws.columns:
-            max_length = max((len(str(cell.value)) for cell in col if cell.value), default=0)
-            col_letter = get_column_letter(col[0].column)
-            ws.column_dimensions[col_letter].width = max_length + 2
+        apply_column_widths(ws, worksheet_column_widths(ws, sample_rows=sample_rows))
 
         # === Locate required columns ===
         headers = {str(cell.value).strip().upper(): i + 1 for i, cell in enumerate(ws[1])}
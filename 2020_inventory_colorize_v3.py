@@ -1,11 +1,11 @@
 import pandas as pd
-from openpyxl.utils import get_column_letter
 from openpyxl.styles import PatternFill
 from openpyxl import load_workbook
+from excel_helper import apply_column_widths, worksheet_column_widths
 from path_manager import PathManager
 from collections import defaultdict
 
-def autosize_and_shade_roll_groups(file_path):
+def autosize_and_shade_roll_groups(file_path, sample_rows=None):
     fill_gray = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
     fill_red  = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
 
@@ -147,10 +147,7 @@ def autosize_and_shade_roll_groups(file_path):
             ws.cell(row=row_idx, column= last_col + 4, value= vals["weighted"])
 
         # === STEP 7: Autosize ALL columns (old + new) ===
-        for col in ws.columns:
-            max_length = max((len(str(cell.value)) for cell in col if cell.value), default=0)
-            col_letter = get_column_letter(col[0].column)
-            ws.column_dimensions[col_letter].width = max_length + 2
+        apply_column_widths(ws, worksheet_column_widths(ws, sample_rows=sample_rows))
 
         # === STEP 8: Shade mismatched‐cost groups exactly as before ===
         # Build a fresh shade_group_map keyed by (warehouse, item, roll) using original cost
@@ -0,0 +1,57 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from transformer_factory import TransformerFactory
+from template_helper import TemplateHelper, write_shard
+from classified_inventory import LOT_KEY, load_classified_inventory
+
+# Every API document built from the classified inventory:
+# document type -> (template, output path key, one row per (RWARE#, itemNumber, LOT#))
+INVENTORY_DOCUMENTS = {
+    "API_MMS235MI_AddItmLot": ("API_MMS235MI_AddItmLot.xlsx", "mms235_output_path", True),
+    "API_PCS265MI_Add": ("API_PCS265MI_Add.xlsx", "pcs265_output_path", True),
+    "API_MMS310MI_Update": ("API_MMS310MI_Update.xlsx", "mms310_output_path", False),
+}
+
+
+def main():
+    # 1) Ask for the suffix
+    suffix = input(
+        "Enter the suffix used for the classified inventory file: "
+    ).strip().replace(" ", "_") or "classified"
+
+    # 2) Load the classified inventory once for every document
+    df = load_classified_inventory(suffix)
+    if df is None:
+        return
+
+    # 3) Rows of the per-lot documents: each (RWARE#, itemNumber, LOT#) once,
+    #    sorted by RWARE#, then itemNumber, then LOT#
+    unique_index = df.drop_duplicates(subset=LOT_KEY, keep="first").sort_values(by=LOT_KEY).index
+    print(f"   • Dropped {len(df) - len(unique_index)} duplicates; {len(unique_index)} unique rows remain.")
+
+    # 4) Map every document in one pass; shared fields (ITNO, FACI, BANO, ...) are computed once
+    mapper_path = Path("config") / "document_mappings.yml"
+    factory = TransformerFactory(str(mapper_path))
+    frames = factory.transform_frames(list(INVENTORY_DOCUMENTS), df)
+
+    # 5) Fill and save the templates in parallel; outputs over their [MAX_ROWS]
+    #    limit are split, and every file is a separate task
+    tasks = []
+    for document_type, (template_name, output_key, per_lot) in INVENTORY_DOCUMENTS.items():
+        frame = frames[document_type]
+        if per_lot:
+            frame = frame.loc[unique_index]
+        for output_path, rows in TemplateHelper(template_name).split_output(frame, output_key):
+            tasks.append((document_type, template_name, rows, output_path))
+
+    workers = min(os.cpu_count() or 1, len(tasks))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [(document_type, len(rows), executor.submit(write_shard, template_name, rows, output_path))
+                   for document_type, template_name, rows, output_path in tasks]
+        for document_type, row_count, future in futures:
+            print(f"✅ {document_type} spreadsheet has been created: {future.result()} ({row_count} rows).")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ import pandas as pd
 from pathlib import Path
 from types import SimpleNamespace
 from config_reader import ConfigReader
-from dancik_uom import UOMService
+from dancik_uom import UOMServiceFactory
 from query_loader import QueryLoader
 from database import Database
 from template_helper import TemplateHelper
@@ -57,17 +57,21 @@ def main():
 
     print("Available columns:", df.columns.tolist())
 
+    # Load package data for every priced item in one pass
+    uom_factory = UOMServiceFactory(df["ITEMNUMBER"].unique())
+
     # 7) Initialize TransformerFactory (using document_mappings.yml)
     mapper_path = Path("config") / "document_mappings.yml"
     factory = TransformerFactory(str(mapper_path))
 
     # load the template for the output
     template_helper = TemplateHelper("API_OIS017MI_AddBasePrice.xlsx")
+    transformed_rows = []
 
     for _, row in df.iterrows():
         try:
             item_number = row["ITEMNUMBER"]
-            uom_service = UOMService(item_number)
+            uom_service = uom_factory.get(item_number)
 
             row["sales_price"] = uom_service.convert_price(row["LIST"], row["IUNITS"], get_sales_uom(row), 2)
             row["valid_from"] = valid_from_date
@@ -76,7 +80,7 @@ def main():
 
             transformed = factory.transform_row("API_OIS017MI_AddBasePrice", row)
             if transformed:
-                template_helper.add_row(transformed)
+                transformed_rows.append(transformed)
 
             print(f"Processed item: {item_number}, {row["LIST"]} / IUNITS: {row['IUNITS']}, Sales Price: {row['sales_price']} per {get_sales_uom(row)}")
         except Exception as e:
@@ -84,7 +88,7 @@ def main():
             continue
 
     print(f"Fetched {len(df)} rows from the database.")
-    template_helper.save("ois017_output_path")
+    template_helper.save_rows(transformed_rows, "ois017_output_path")
 
 
 if __name__ == "__main__":
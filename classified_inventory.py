@@ -0,0 +1,65 @@
+import pandas as pd
+from path_manager import PathManager
+from stage_store import load_stage
+
+# Classified inventory as read by the 2020 API document scripts
+# (2020_inventory_documents, 2020_MMS235MI_AddItmLot, 2020_MMS310MI_Update)
+SHEETS_TO_PROCESS = {"Roll Goods", "Shade Controlled", "Non Lot Controlled"}
+LOT_KEY = ["RWARE#", "itemNumber", "LOT#"]
+
+
+def cyy_to_yyyymmdd(cyy_str: str) -> str:
+    """
+    Convert a CYYMMDD string (e.g. "1241002") to "YYYYMMDD" (e.g. "20241002").
+    C = century digit (0 → 1900s, 1 → 2000s), YY = year, MM = month, DD = day.
+    If the input isn’t exactly 7 digits or non‐numeric, returns an empty string.
+    """
+    s = (cyy_str or "").strip()
+    if len(s) != 7 or not s.isdigit():
+        return ""
+    c  = int(s[0])
+    yy = int(s[1:3])
+    mm = s[3:5]
+    dd = s[5:7]
+    year = 1900 + yy + (c * 100)
+    return f"{year:04d}{mm}{dd}"
+
+
+def load_classified_inventory(suffix):
+    """
+    Rows of the lot-bearing sheets of the classified inventory, from the stage
+    written by 2020_inventory_colorize_v4 when it is current, otherwise from
+    the workbook. RLRCTD is converted to YYYYMMDD; rows without an item,
+    warehouse or lot are dropped.
+    :return: DataFrame, or None when there is nothing to load.
+    """
+    path_manager = PathManager()
+    classified_path = path_manager.get_path("PATHS", "inventory_classified_path", suffix=suffix, check_path=False)
+    sheets = load_stage("inventory_classified", suffix, sheets=SHEETS_TO_PROCESS, as_text=True,
+                        newer_than=classified_path)
+    if sheets is None or any("LOT#" not in df_sheet.columns for df_sheet in sheets.values()):
+        if not classified_path.exists():
+            print(f"❌ Classified‐inventory file not found at: {classified_path}")
+            return None
+
+        print(f"🔍 Loading classified inventory from: {classified_path}")
+        sheets = {}
+        with pd.ExcelFile(classified_path, engine="openpyxl") as xls:
+            for sheet_name in xls.sheet_names:
+                if sheet_name in SHEETS_TO_PROCESS:
+                    sheets[sheet_name] = pd.read_excel(xls, sheet_name=sheet_name, engine="openpyxl", dtype=str)
+    else:
+        print(f"🔍 Loading classified inventory from stage '{suffix}' in migration.db")
+
+    dfs = []
+    for df_sheet in sheets.values():
+        df_sheet["RLRCTD"] = df_sheet["RLRCTD"].fillna("").astype(str).apply(cyy_to_yyyymmdd)
+        df_sheet = df_sheet.dropna(subset=LOT_KEY)
+        df_sheet = df_sheet[df_sheet["LOT#"].str.strip() != ""]
+        dfs.append(df_sheet)
+
+    if not dfs:
+        print("❌ No valid sheets (Roll Goods/​Shade Controlled/​Non Lot Controlled) found.")
+        return None
+
+    return pd.concat(dfs, ignore_index=True)
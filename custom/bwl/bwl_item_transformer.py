@@ -2,6 +2,8 @@ from transformers.base import BaseTransformer
 import re
 
 class BWLItemTransformer(BaseTransformer):
+    # Special cases for manufacturer prefixes
+    SPECIAL_PREFIXES = {"CAS": "CA", "CAR": "CR", "CAP": "CP"}
 
     def get_item_number(self):
         item_number = getattr(self.row, 'ITEMNUMBER', '').strip()
@@ -12,15 +14,23 @@ class BWLItemTransformer(BaseTransformer):
         mfgr_prefix = item_number[:3]  # Get the first three characters
         item_suffix = item_number[3:]  # The rest of the item number
 
-        # Define special cases for manufacturer prefixes
-        special_prefixes = {"CAS": "CA", "CAR": "CR", "CAP": "CP"}
-
         # Determine new prefix
-        new_prefix = special_prefixes.get(mfgr_prefix, mfgr_prefix[:2])
+        new_prefix = self.SPECIAL_PREFIXES.get(mfgr_prefix, mfgr_prefix[:2])
 
         cleaned_item_number = new_prefix + item_suffix
 
         return self._sanitize(cleaned_item_number)
 
+    @staticmethod
+    def get_item_number_column(df):
+        item_number = BaseTransformer.column(df, 'ITEMNUMBER').str.strip()
+
+        mfgr_prefix = item_number.str[:3]
+        new_prefix = mfgr_prefix.map(BWLItemTransformer.SPECIAL_PREFIXES).fillna(mfgr_prefix.str[:2])
+        cleaned_item_number = (new_prefix + item_number.str[3:]).str.replace(r"[ \\/&.]", "_", regex=True)
+
+        # Too short to carry a manufacturer prefix: returned as is
+        return item_number.where(item_number.str.len() < 3, cleaned_item_number)
+
     def _sanitize(self, value: str) -> str:
         return re.sub(r"[ \\/&.]", "_", value)
\ No newline at end of file
@@ -1,18 +1,30 @@
 import logging
-from collections import deque
+import threading
+from collections import deque, OrderedDict
+from functools import lru_cache
+import numpy as np
+import pandas as pd
 from database import Database
 from config_reader import ConfigReader
 from pprint import pprint
 from decimal import Decimal, ROUND_HALF_UP, ROUND_HALF_DOWN
 
 
+@lru_cache(maxsize=None)
+def _quantum(precision):
+    return Decimal(f"0.{'0' * precision}")
+
+
 class UOMService:
+    # Conversion graphs are shared between items with identical conversion
+    # inputs (most items in a package class); bounded LRU of the most recent ones
+    GRAPH_CACHE_SIZE = 4096
+    _graph_cache = OrderedDict()
+    _graph_cache_lock = threading.Lock()
+
     def __init__(self, item_number, final_result_precision=2):
-        # setup logging
-        self.logger = logging.getLogger(__name__)
-        self.final_result_precision = final_result_precision
-        self.db = Database()
         self.item_number = item_number
+        self.db = Database()
         self.config = ConfigReader.get_instance()
         query_path = self.config.get("QUERIES", "dancik_package_query_path", "queries/dancik_package_query.sql")
         query_item_package_path = self.config.get("QUERIES", "dancik_package_item_query_path", "queries/dancik_package_item_query.sql")
@@ -20,12 +32,28 @@ class UOMService:
             self.package_query = file.read()
         with open(query_item_package_path) as file:
             self.item_package_query = file.read()
-        self.item_details = self._load_item_details()
-        self._build_bidirectional_conversion_graph()
+        self._setup(self._load_item_details(), final_result_precision)
+
+    @classmethod
+    def from_item_details(cls, item_number, item_details, final_result_precision=2):
+        """
+        Build a service from package data that is already in memory
+        (see UOMServiceFactory), skipping the query files and the per-item query.
+        """
+        service = cls.__new__(cls)
+        service.item_number = item_number
+        service._setup(item_details, final_result_precision)
+        return service
+
+    def _setup(self, item_details, final_result_precision):
+        # setup logging
+        self.logger = logging.getLogger(__name__)
+        self.final_result_precision = final_result_precision
+        self.item_details = item_details
+        self._load_conversion_graph()
         self.logger.debug("Conversion graph:")
         self.logger.debug(self.graph)
 
-
     def _load_item_details(self):
         with self.db as db:
             df = db.fetch_dataframe(self.package_query, (self.item_number,))
@@ -61,6 +89,51 @@ class UOMService:
         graph[to_uom][from_uom] = Decimal("1") / dec_qty
         graph[from_uom][to_uom] = dec_qty
 
+    def graph_signature(self):
+        """
+        Everything _build_bidirectional_conversion_graph reads from item_details.
+        Quantities and width are keyed by str() since that is what goes into Decimal.
+        Items with equal signatures share one conversion graph; 0010_build_uom_factors
+        stores repr() of it to detect changed package data.
+        """
+        item_details = self.item_details
+        package_rows = tuple(
+            (i, str(item_details[f"UMF_{i}"]), item_details[f"UM1_{i}"], item_details[f"UM2_{i}"])
+            for i in range(1, 7)
+            if f"UMF_{i}" in item_details and f"UM1_{i}" in item_details and f"UM2_{i}" in item_details
+        )
+        compo = item_details["ICOMPO"]
+        # width only matters for roll goods
+        width = str(item_details["IWIDTH"]) if compo == 'R' else None
+        return package_rows, compo, width
+
+    def _load_conversion_graph(self):
+        """
+        Set self.graph, reusing a cached graph built for an earlier item with
+        the same conversion inputs. Cached graphs are shared, never modified.
+        """
+        if self.item_details is None:
+            self.graph = {}
+            self.paths = {}
+            return
+
+        key = self.graph_signature()
+        cache = UOMService._graph_cache
+        with UOMService._graph_cache_lock:
+            entry = cache.get(key)
+            if entry is not None:
+                cache.move_to_end(key)
+        if entry is not None:
+            self.graph, self.paths = entry
+            return
+
+        self._build_bidirectional_conversion_graph()
+        self.paths = self._compute_conversion_paths(self.graph)
+        with UOMService._graph_cache_lock:
+            cache[key] = (self.graph, self.paths)
+            if len(cache) > UOMService.GRAPH_CACHE_SIZE:
+                cache.popitem(last=False)
+
     def _build_bidirectional_conversion_graph(self):
         item_details = self.item_details
         self.graph = {}
@@ -96,35 +169,43 @@ class UOMService:
             width_feet = width / Decimal("12")
             self._add_conversion_to_graph(width_feet, "SF", "LF")
 
+    @staticmethod
+    def _compute_conversion_paths(graph):
+        """
+        Precompute the conversion steps between every pair of units, so
+        convert() is a dictionary lookup instead of a BFS per call.
+        Returns {from_uom: {to_uom: ((step_from, step_to, factor), ...)}}.
+
+        The BFS visits neighbours in the same order as the old per-call search,
+        so every pair gets the same path (and therefore the same factors,
+        applied in the same order) as before.
+        """
+        paths = {}
+        for from_uom in graph:
+            # initialize the queue with the from_uom, so converting from CT to CT
+            # gets an empty path and the conversion rate is automatically 1
+            from_paths = {from_uom: ()}
+            queue = deque([from_uom])
+            while queue:
+                current_unit = queue.popleft()
+                current_path = from_paths[current_unit]
+                for neighbor, conversion_rate in graph[current_unit].items():
+                    if neighbor not in from_paths:
+                        from_paths[neighbor] = current_path + ((current_unit, neighbor, conversion_rate),)
+                        queue.append(neighbor)
+            paths[from_uom] = from_paths
+        return paths
+
     def _find_conversion_path(self, from_uom, to_uom):
         if from_uom not in self.graph or to_uom not in self.graph:
             raise ValueError(f"Cannot convert between {from_uom} and {to_uom} for item number {self.item_number}")
 
-        path = []
-
-        # initialize the queue with the from_uom, conversion factor 1, and an empty path
-        # this way, if you are convertion from CT to CT ( why, could happen ), the conversion rate is authomatically 1;
-        # plus, this primes the system
-        queue = deque([(from_uom, [], Decimal("1"))])
-        visited = set()
-
-
-        while queue:
-            current_unit, path, factor = queue.popleft()
-            if current_unit in visited:
-                continue
-            visited.add(current_unit)
-
-            if current_unit == to_uom:
-                return path  # Return list of conversion steps
-
-            for neighbor, conversion_rate in self.graph[current_unit].items():
-                if neighbor not in visited:
-                    queue.append((neighbor, path + [(current_unit, neighbor, conversion_rate)], conversion_rate))
-
-        #raise ValueError(f"No conversion path found between {from_uom} and {to_uom} for item {self.item_number}.")
-        print (f"Error: No conversion path found between {from_uom} and {to_uom} for item {self.item_number}.")
-        return []
+        path = self.paths[from_uom].get(to_uom)
+        if path is None:
+            #raise ValueError(f"No conversion path found between {from_uom} and {to_uom} for item {self.item_number}.")
+            print (f"Error: No conversion path found between {from_uom} and {to_uom} for item {self.item_number}.")
+            return ()
+        return path
 
     def get_uom_list(self):
         return list(self.graph.keys())
@@ -144,13 +225,17 @@ class UOMService:
         conversion_steps = self._find_conversion_path(from_uom, to_uom)
         dec_value = Decimal(str(value)) # make sure its a decimal because floating point math is iffy and imprecise
 
-        self.logger.debug(f"Conversion steps from {from_uom} to {to_uom}:")
-        for step_from, step_to, factor in conversion_steps:
-            self.logger.debug(f"  {step_from} -> {step_to}  factor: {factor}")
+        # the factors are applied one step at a time (not pre-multiplied) so each
+        # intermediate result is rounded in the active decimal context exactly as before
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Conversion steps from {from_uom} to {to_uom}:")
+            for step_from, step_to, factor in conversion_steps:
+                self.logger.debug(f"  {step_from} -> {step_to}  factor: {factor}")
+        for _, _, factor in conversion_steps:
             dec_value *= factor
 
         # round the final value to the final_result_prevision using ROUND_HALF_UP
-        rounded_result = dec_value.quantize(Decimal(f"0.{'0' * final_result_precision}"), rounding=ROUND_HALF_DOWN)
+        rounded_result = dec_value.quantize(_quantum(final_result_precision), rounding=ROUND_HALF_DOWN)
 
         #print(f"Final result: {rounded_result}  raw value: {dec_value}")
         return rounded_result
@@ -169,9 +254,271 @@ class UOMService:
         conversion_steps = self._find_conversion_path(from_uom, to_uom)
         dec_value = Decimal(str(value))
 
-        self.logger.debug(f"Price conversion from {from_uom} to {to_uom}")
-        for step_from, step_to, factor in conversion_steps:
-            self.logger.debug(f"  {step_from} -> {step_to} ÷ {factor}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Price conversion from {from_uom} to {to_uom}")
+            for step_from, step_to, factor in conversion_steps:
+                self.logger.debug(f"  {step_from} -> {step_to} ÷ {factor}")
+        for _, _, factor in conversion_steps:
             dec_value /= factor  # Use division for price
 
-        return dec_value.quantize(Decimal(f"0.{'0' * final_result_precision}"), rounding=ROUND_HALF_UP)
\ No newline at end of file
+        return dec_value.quantize(_quantum(final_result_precision), rounding=ROUND_HALF_UP)
+
+
+class UOMServiceFactory:
+    """
+    Loads the package data for a set of items (or all of dancik_items) up front
+    and hands out UOMService instances built from memory, so scripts don't
+    read query files or run a query for every row.
+    """
+
+    # Stay below SQLite's limit on host parameters per statement
+    BATCH_SIZE = 900
+
+    def __init__(self, item_numbers=None, final_result_precision=2):
+        self.logger = logging.getLogger(__name__)
+        self.final_result_precision = final_result_precision
+        self.config = ConfigReader.get_instance()
+        package_query = self._read_query("dancik_package_bulk_query_path", "queries/dancik_package_bulk_query.sql")
+        item_package_query = self._read_query("dancik_package_item_bulk_query_path", "queries/dancik_package_item_bulk_query.sql")
+
+        if item_numbers is not None:
+            item_numbers = list(dict.fromkeys(i for i in item_numbers if i is not None))
+
+        with Database(read_only=True) as db:
+            package_details, package_multiple = self._index(self._fetch(db, package_query, item_numbers))
+            # Items without a package class fall back to their own item-level UOM columns
+            if item_numbers is None:
+                remaining = None
+            else:
+                remaining = [i for i in item_numbers if i not in package_details and i not in package_multiple]
+            item_details, item_multiple = self._index(self._fetch(db, item_package_query, remaining))
+
+        self.multiple = package_multiple | (item_multiple - package_details.keys())
+        self.item_details = {**item_details, **package_details}
+        for item_number in self.multiple:
+            self.item_details.pop(item_number, None)
+        self._services = {}
+        self.logger.debug(f"Preloaded package data for {len(self.item_details)} items")
+
+    def _read_query(self, key, default):
+        with open(self.config.get("QUERIES", key, default)) as file:
+            return file.read()
+
+    def _fetch(self, db, query, item_numbers):
+        if item_numbers is None:
+            return db.fetch_dataframe(query)
+        frames = []
+        for start in range(0, len(item_numbers), self.BATCH_SIZE):
+            batch = item_numbers[start:start + self.BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
+            frames.append(db.fetch_dataframe(
+                f"select * from ({query}) where itemNumber in ({placeholders})", tuple(batch)
+            ))
+        if not frames:
+            return db.fetch_dataframe(f"select * from ({query}) where 0")
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def _index(df):
+        """
+        Map itemNumber -> package row dict; items with more than one row are
+        returned separately since they cannot be converted reliably.
+        """
+        details = {}
+        multiple = set()
+        for record in df.to_dict(orient="records"):
+            item_number = record.pop("itemNumber")
+            if item_number in details:
+                multiple.add(item_number)
+            details[item_number] = record
+        for item_number in multiple:
+            del details[item_number]
+        return details, multiple
+
+    def get(self, item_number):
+        """
+        Return the UOMService for item_number, building it on first use.
+        """
+        service = self._services.get(item_number)
+        if service is None:
+            item_details = self.item_details.get(item_number)
+            if item_number in self.multiple:
+                print(f"Error: Multiple item details found for item number {item_number}")
+            elif item_details is None:
+                print(f"Error: No item details found for item number {item_number}")
+            service = UOMService.from_item_details(item_number, item_details, self.final_result_precision)
+            self._services[item_number] = service
+        return service
+
+    def convert_columns(self, item_numbers, from_uoms, to_uoms, quantities=None, prices=None,
+                        quantity_precision=2, price_precision=6, fast=False, check_sample=1000):
+        """
+        Convert whole columns of quantities and/or prices at once.
+
+        Rows are grouped by (conversion graph, from_uom, to_uom), so the
+        conversion steps are looked up once per group and then applied to every
+        value in it. Results are identical to calling convert() / convert_price()
+        row by row.
+
+        fast=True switches to float64 arithmetic: each group is one NumPy
+        multiply/divide by the product of its factors, rounded with np.round.
+        Missing values come back as NaN instead of raising. It is meant for bulk
+        analytics, not for M3 load files. The deviation from the exact Decimal
+        path is measured on `check_sample` random rows, printed, and returned in
+        result.attrs["max_deviation"].
+
+        Returns a DataFrame (indexed like item_numbers when it is a Series) with
+        'quantity' and 'price' columns (None when not requested), a boolean
+        'error' mask, and 'error_message' holding the first error for that row.
+        """
+        index = item_numbers.index if isinstance(item_numbers, pd.Series) else None
+        item_numbers = list(item_numbers)
+        from_uoms = list(from_uoms)
+        to_uoms = list(to_uoms)
+        quantities = list(quantities) if quantities is not None else None
+        prices = list(prices) if prices is not None else None
+
+        size = len(item_numbers)
+        errors = [None] * size
+        if fast:
+            quantity_out = np.full(size, np.nan)
+            price_out = np.full(size, np.nan)
+            quantity_in = self._to_float_array(quantities, errors) if quantities is not None else None
+            price_in = self._to_float_array(prices, errors) if prices is not None else None
+            convert_group = self._convert_group_fast
+        else:
+            quantity_out = [None] * size
+            price_out = [None] * size
+            quantity_in = quantities
+            price_in = prices
+            convert_group = self._convert_group
+
+        groups = {}
+        for pos, (item_number, from_uom, to_uom) in enumerate(zip(item_numbers, from_uoms, to_uoms)):
+            service = self.get(item_number)
+            # services built from identical package data share one graph object
+            key = (id(service.graph), from_uom, to_uom)
+            groups.setdefault(key, (service, []))[1].append(pos)
+
+        for (_, from_uom, to_uom), (service, positions) in groups.items():
+            if quantities is not None:
+                convert_group(service, positions, item_numbers, quantity_in, from_uom, to_uom,
+                              quantity_precision, quantity_out, errors, price=False)
+            if prices is not None:
+                convert_group(service, positions, item_numbers, price_in, from_uom, to_uom,
+                              price_precision, price_out, errors, price=True)
+
+        result = pd.DataFrame({
+            "quantity": quantity_out,
+            "price": price_out,
+            "error": [e is not None for e in errors],
+            "error_message": errors,
+        }, index=index)
+
+        if fast and check_sample and size:
+            rng = np.random.default_rng(0)
+            sample = np.sort(rng.choice(size, min(check_sample, size), replace=False))
+            exact = self.convert_columns(
+                [item_numbers[i] for i in sample], [from_uoms[i] for i in sample], [to_uoms[i] for i in sample],
+                [quantities[i] for i in sample] if quantities is not None else None,
+                [prices[i] for i in sample] if prices is not None else None,
+                quantity_precision, price_precision,
+            )
+            deviation = {}
+            for column, fast_out, requested in (("quantity", quantity_out, quantities), ("price", price_out, prices)):
+                if requested is None:
+                    continue
+                exact_values = pd.to_numeric(exact[column], errors="coerce").to_numpy(dtype=float)
+                diff = np.abs(fast_out[sample] - exact_values)
+                deviation[column] = float(np.nanmax(diff)) if not np.isnan(diff).all() else 0.0
+            result.attrs["max_deviation"] = deviation
+            print(f"Fast UOM conversion: max deviation from Decimal over {len(sample)} sampled rows: {deviation}")
+
+        return result
+
+    @staticmethod
+    def _to_float_array(values, errors):
+        """
+        float64 view of a value column for fast mode; missing values become NaN,
+        values that are not numbers at all are flagged as errors.
+        """
+        series = pd.Series(values, dtype=object)
+        as_float = pd.to_numeric(series, errors="coerce")
+        for pos in np.flatnonzero(as_float.isna().to_numpy() & series.notna().to_numpy()):
+            if errors[pos] is None:
+                errors[pos] = f"Invalid numeric value {values[pos]!r}"
+        return as_float.to_numpy(dtype=float)
+
+    @staticmethod
+    def _convert_group_fast(service, positions, item_numbers, values, from_uom, to_uom, precision, out, errors, price):
+        """
+        float64 counterpart of _convert_group: the group's factors are multiplied
+        together once (in Decimal) and applied to all of its values in one step.
+        """
+        positions = np.asarray(positions)
+        if (price and from_uom == "IN" and to_uom == "SY") or from_uom == to_uom:
+            out[positions] = values[positions]
+            return
+        if service.item_details is None:
+            return
+
+        if from_uom not in service.graph or to_uom not in service.graph:
+            for pos in positions:
+                if errors[pos] is None:
+                    errors[pos] = f"Cannot convert between {from_uom} and {to_uom} for item number {item_numbers[pos]}"
+            return
+
+        steps = service.paths[from_uom].get(to_uom)
+        if steps is None:
+            for item_number in dict.fromkeys(item_numbers[pos] for pos in positions):
+                print(f"Error: No conversion path found between {from_uom} and {to_uom} for item {item_number}.")
+            steps = ()
+        factor = Decimal("1")
+        for _, _, step_factor in steps:
+            factor *= step_factor
+        factor = float(factor)
+
+        converted = values[positions] / factor if price else values[positions] * factor
+        out[positions] = np.round(converted, precision)
+
+    @staticmethod
+    def _convert_group(service, positions, item_numbers, values, from_uom, to_uom, precision, out, errors, price):
+        """
+        Apply one group's conversion steps to its values, mirroring the early
+        returns and error handling of convert() / convert_price().
+        """
+        if (price and from_uom == "IN" and to_uom == "SY") or from_uom == to_uom:
+            for pos in positions:
+                out[pos] = values[pos]
+            return
+        if service.item_details is None:
+            return
+
+        if from_uom not in service.graph or to_uom not in service.graph:
+            for pos in positions:
+                if errors[pos] is None:
+                    errors[pos] = f"Cannot convert between {from_uom} and {to_uom} for item number {item_numbers[pos]}"
+            return
+
+        steps = service.paths[from_uom].get(to_uom)
+        if steps is None:
+            for item_number in dict.fromkeys(item_numbers[pos] for pos in positions):
+                print(f"Error: No conversion path found between {from_uom} and {to_uom} for item {item_number}.")
+            steps = ()
+        factors = [factor for _, _, factor in steps]
+        quantum = _quantum(precision)
+        rounding = ROUND_HALF_UP if price else ROUND_HALF_DOWN
+
+        for pos in positions:
+            try:
+                dec_value = Decimal(str(values[pos]))
+                if price:
+                    for factor in factors:
+                        dec_value /= factor
+                else:
+                    for factor in factors:
+                        dec_value *= factor
+                out[pos] = dec_value.quantize(quantum, rounding=rounding)
+            except Exception as e:
+                if errors[pos] is None:
+                    errors[pos] = str(e)
@@ -1,26 +1,119 @@
+import os
+import queue
 import sqlite3
+import threading
+from pathlib import Path
 import pandas as pd
-from config_reader import ConfigReader
 from path_manager import PathManager
 
+# Applied once when a pooled connection is opened
+PRAGMAS = {
+    "mmap_size": 268435456,  # 256 MB
+    "cache_size": -65536,    # negative = KiB, so 64 MB
+    "temp_store": "MEMORY",
+}
+
+# Only meaningful (and only allowed) on writable connections
+WRITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+}
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of tuned SQLite connections to a single database file.
+    Idle connections are reused instead of being reopened for every `with` block.
+    """
+
+    def __init__(self, db_path, read_only=False, max_idle=8):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+
+    def _connect(self):
+        if self.read_only:
+            uri = Path(self.db_path).resolve().as_posix()
+            conn = sqlite3.connect(f"file:{uri}?mode=ro", uri=True, check_same_thread=False)
+            pragmas = {**PRAGMAS, "query_only": "ON"}
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            pragmas = {**PRAGMAS, **WRITE_PRAGMAS}
+        for name, value in pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        if self._idle.qsize() < self.max_idle:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
 class Database:
-    def __init__(self):
-        config = ConfigReader.get_instance()
-        path_manager = PathManager()
-        self.db_path = path_manager.get_path("PATHS", "db_path")
+    # (pid, db_path, read_only) -> ConnectionPool; keyed by pid so forked
+    # worker processes never reuse a connection opened by their parent
+    _pools = {}
+    _pools_lock = threading.Lock()
+    _default_db_path = None
+
+    def __init__(self, read_only=False):
+        if Database._default_db_path is None:
+            path_manager = PathManager()
+            Database._default_db_path = path_manager.get_path("PATHS", "db_path")
+        self.db_path = Database._default_db_path
+        self.read_only = read_only
+
+    @classmethod
+    def get_pool(cls, db_path, read_only=False):
+        key = (os.getpid(), str(db_path), read_only)
+        with cls._pools_lock:
+            pool = cls._pools.get(key)
+            if pool is None:
+                pool = cls._pools[key] = ConnectionPool(db_path, read_only=read_only)
+            return pool
+
+    @classmethod
+    def close_all(cls):
+        """Close every idle pooled connection opened by this process."""
+        with cls._pools_lock:
+            for (pid, _, _), pool in list(cls._pools.items()):
+                if pid == os.getpid():
+                    pool.close_all()
 
     def __enter__(self):
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        self.pool = Database.get_pool(self.db_path, self.read_only)
+        self.conn = self.pool.acquire()
         self.cursor = self.conn.cursor()
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        if exc_type:
-            self.conn.rollback()
-        else:
-            self.conn.commit()
-        self.conn.close()
+        try:
+            if exc_type:
+                self.conn.rollback()
+            else:
+                self.conn.commit()
+            self.cursor.close()
+        except sqlite3.Error:
+            # A broken connection is dropped instead of going back to the pool
+            self.conn.close()
+            raise
+        self.pool.release(self.conn)
 
     def execute(self, query, params=None):
         if params is None:
@@ -32,4 +125,4 @@ class Database:
         """Execute a SQL query and return the results as a Pandas DataFrame."""
         if params is None:
             params = ()
-        return pd.read_sql_query(query, self.conn, params=params)
\ No newline at end of file
+        return pd.read_sql_query(query, self.conn, params=params)
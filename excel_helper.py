@@ -1,4 +1,83 @@
-from openpyxl import load_workbook
+import os
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from openpyxl.utils import get_column_letter
+
+# Rows sampled per sheet when a caller opts into sized-from-a-sample columns
+WIDTH_SAMPLE_ROWS = 20000
+
+
+def _text_lengths(values):
+    """
+    len(str(value)) for the values Excel shows as non-empty (falsy ones are
+    skipped, as the cell walks did). Whole floats are measured as ints, since
+    that is how they read back from the workbook.
+    """
+    values = values[values.notna()]
+    if values.dtype.kind == "b":
+        return values[values].astype(str).str.len()
+    if values.dtype.kind in "iuf":
+        values = values[values != 0]
+        if values.dtype.kind == "f":
+            whole = np.isfinite(values) & (values == np.floor(values))
+            text = values.astype(str)
+            text[whole] = values[whole].astype("int64").astype(str)
+            return text.str.len()
+        return values.astype(str).str.len()
+    values = values[(values != "") & (values != 0)]
+    return values.astype(str).str.len()
+
+
+def column_widths(df, sample_rows=None, include_header=True, padding=2):
+    """
+    Column widths for a sheet about to be written from `df`, one per column:
+    the longest value (and header) text plus padding.
+
+    :param sample_rows: Only measure this many randomly chosen rows.
+    :param include_header: Count the column names as the header row.
+    """
+    if sample_rows and len(df) > sample_rows:
+        positions = np.sort(np.random.default_rng(0).choice(len(df), sample_rows, replace=False))
+        df = df.iloc[positions]
+
+    widths = []
+    for position, name in enumerate(df.columns):
+        lengths = _text_lengths(df.iloc[:, position])
+        max_length = int(lengths.max()) if len(lengths) else 0
+        if include_header and name is not None and name != "":
+            max_length = max(max_length, len(str(name)))
+        widths.append(max_length + padding)
+    return widths
+
+
+def worksheet_column_widths(ws, sample_rows=None, padding=2):
+    """
+    column_widths() for a sheet that only exists as an openpyxl worksheet,
+    measured row by row as the sheet is walked.
+
+    :param sample_rows: Only measure the header and this many randomly chosen rows.
+    """
+    rows = ws.iter_rows(values_only=True)
+    if sample_rows and ws.max_row > sample_rows:
+        keep = set(np.random.default_rng(0).choice(ws.max_row, sample_rows, replace=False).tolist())
+        # Row 0 is the header and is always measured
+        rows = (row for idx, row in enumerate(rows) if idx == 0 or idx in keep)
+
+    max_lengths = [0] * ws.max_column
+    for row in rows:
+        for idx, value in enumerate(row):
+            if value and len(str(value)) > max_lengths[idx]:
+                max_lengths[idx] = len(str(value))
+    return [length + padding for length in max_lengths]
+
+
+def apply_column_widths(ws, widths):
+    for idx, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+
 
 class ExcelTemplate:
     def __init__(self, template_file):
@@ -11,6 +90,8 @@ class ExcelTemplate:
         self.wb = load_workbook(template_file)
         self.ws = self.wb.active  # Modify if a specific sheet is needed
         self.column_mapping = self._load_column_mapping()
+        # Longest text per column index, kept up to date by set_value()
+        self._text_widths = dict(enumerate(worksheet_column_widths(self.ws, padding=0), start=1))
 
     def _load_column_mapping(self):
         """
@@ -36,6 +117,8 @@ class ExcelTemplate:
         if column_name in self.column_mapping:  # Ensure column exists
             col_index = self.column_mapping[column_name]
             self.ws.cell(row=row, column=col_index, value=value)
+            if value:
+                self._text_widths[col_index] = max(self._text_widths.get(col_index, 0), len(str(value)))
         else:
             raise ValueError(f"Column '{column_name}' not found in Excel template.")
 
@@ -50,21 +133,246 @@ class ExcelTemplate:
     def adjust_column_widths(self):
         """
         Adjusts column widths based on the length of the longest value in each column.
+        Lengths are tracked by set_value(), so this does not re-read the sheet.
         """
         try:
-            for col in self.ws.columns:
-                max_length = 0
-                col_letter = col[0].column_letter  # Get the column letter (A, B, C, etc.)
-                for cell in col:
-                    try:
-                        if cell.value:
-                            max_length = max(max_length, len(str(cell.value)))
-                    except:
-                        pass
+            for col_index, max_length in self._text_widths.items():
                 adjusted_width = max_length + 2  # Add some padding
-                self.ws.column_dimensions[col_letter].width = adjusted_width
+                self.ws.column_dimensions[get_column_letter(col_index)].width = adjusted_width
 
             print(f"✅ Column widths adjusted in {self.template_file}")
 
         except Exception as e:
             print(f"❌ Error adjusting column widths: {e}")
+
+
+class StreamingExcelWriter:
+    """
+    Constant-memory .xlsx writer for large exports.
+
+    Backed by an openpyxl write-only workbook: rows are serialized as soon as
+    they are appended, so memory stays flat however many rows are written.
+    Feed it DataFrames or lists of dicts in batches; the header row of each
+    sheet is taken from its first batch.
+    """
+
+    # Rows converted to plain Python values at a time when appending a DataFrame
+    BATCH_SIZE = 10000
+
+    def __init__(self, output_file, autosize=False, autosize_rows=None):
+        """
+        :param output_file: Path of the .xlsx file written on close().
+        :param autosize: Size the columns of sheets created by append_frame() /
+                         append_records(). A write-only sheet takes its widths
+                         before its first row, so the rows are held back until
+                         they have been measured.
+        :param autosize_rows: Measure (and hold back) only the first this many
+                              rows of each sheet; by default every row is
+                              measured and the sheet is written on close().
+        """
+        self.output_file = output_file
+        self.autosize = autosize
+        self.autosize_rows = autosize_rows
+        self.wb = Workbook(write_only=True)
+        self._sheets = {}  # sheet name -> (worksheet, columns)
+        self._pending = {}  # sheet name -> (worksheet, columns, held-back batches), autosize only
+        self.rows_written = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def add_sheet(self, sheet_name, columns, column_widths=None, freeze_header=False, hidden_columns=None):
+        """
+        Creates a sheet up front, for layout that a write-only sheet only
+        accepts before its first row.
+
+        :param columns: Header row.
+        :param column_widths: Optional list of widths, one per column.
+        :param freeze_header: Freeze the header row.
+        :param hidden_columns: Optional names of columns to hide (e.g. helper columns).
+        """
+        if sheet_name in self._sheets or sheet_name in self._pending:
+            raise ValueError(f"Sheet '{sheet_name}' already has rows.")
+        ws = self.wb.create_sheet(title=sheet_name)
+        return self._layout_sheet(sheet_name, columns, ws, column_widths, freeze_header, hidden_columns)
+
+    def _layout_sheet(self, sheet_name, columns, ws, column_widths=None, freeze_header=False, hidden_columns=None):
+        for idx, width in enumerate(column_widths or [], start=1):
+            ws.column_dimensions[get_column_letter(idx)].width = width
+        for idx, name in enumerate(columns, start=1):
+            if hidden_columns and name in hidden_columns:
+                ws.column_dimensions[get_column_letter(idx)].hidden = True
+        if freeze_header:
+            ws.freeze_panes = "A2"
+        return self._sheet(sheet_name, columns, ws)
+
+    def _sheet(self, sheet_name, columns, ws=None):
+        if sheet_name not in self._sheets:
+            ws = ws or self.wb.create_sheet(title=sheet_name)
+            # Same header look as DataFrame.to_excel: bold, thin border, centered
+            probe = WriteOnlyCell(ws)
+            probe.font = Font(bold=True)
+            probe.border = Border(*(Side(style="thin"),) * 4)
+            probe.alignment = Alignment(horizontal="center", vertical="top")
+            header = []
+            for name in columns:
+                cell = WriteOnlyCell(ws, value=None if name is None else str(name))
+                cell._style = probe._style
+                header.append(cell)
+            ws.append(header)
+            self._sheets[sheet_name] = (ws, list(columns))
+            self.rows_written[sheet_name] = 0
+        return self._sheets[sheet_name]
+
+    def _hold_back(self, sheet_name, columns, batch):
+        """
+        Queues a batch of a sheet that is still being measured for autosize;
+        the sheet is created right away so it keeps its place in the workbook.
+        :return: True when the batch was queued.
+        """
+        if not self.autosize or sheet_name in self._sheets:
+            return False
+        if sheet_name not in self._pending:
+            self._pending[sheet_name] = (self.wb.create_sheet(title=sheet_name), list(columns), [])
+        batches = self._pending[sheet_name][2]
+        batches.append(batch)
+        held = sum(len(rows) for _, rows, _ in batches)
+        if self.autosize_rows and held >= self.autosize_rows:
+            self._flush(sheet_name)
+        return True
+
+    def _flush(self, sheet_name):
+        """Sizes a held-back sheet from its queued rows, then writes them."""
+        ws, columns, batches = self._pending.pop(sheet_name)
+        widths = None
+        for kind, rows, _ in batches:
+            frame = rows if kind == "frame" else pd.DataFrame(rows, columns=columns)
+            batch_widths = column_widths(frame)
+            widths = batch_widths if widths is None else list(map(max, widths, batch_widths))
+        self._layout_sheet(sheet_name, columns, ws, column_widths=widths)
+        for kind, rows, row_fills in batches:
+            if kind == "frame":
+                self.append_frame(rows, sheet_name=sheet_name, row_fills=row_fills)
+            else:
+                self.append_records(rows, sheet_name=sheet_name)
+
+    @staticmethod
+    def _cell_value(value):
+        # NaN / NaT / None all become empty cells, as with DataFrame.to_excel
+        try:
+            return None if pd.isna(value) else value
+        except (TypeError, ValueError):
+            return value
+
+    def append_frame(self, df, sheet_name="Sheet1", row_fills=None):
+        """
+        Appends the rows of a DataFrame (without its index).
+
+        :param df: Rows to write; columns must match earlier batches of the sheet.
+        :param sheet_name: Target sheet, created on first use.
+        :param row_fills: Optional sequence aligned with df's rows holding a
+                          PatternFill (or None) applied to every cell of the row.
+        """
+        if self._hold_back(sheet_name, df.columns, ("frame", df, row_fills)):
+            return
+        ws, _ = self._sheet(sheet_name, df.columns)
+        # Registering a fill with the workbook hashes it; do that once per fill
+        # and share the resulting style between cells
+        styles = {}
+        for start in range(0, len(df), self.BATCH_SIZE):
+            batch = df.iloc[start:start + self.BATCH_SIZE].astype(object)
+            batch = batch.where(batch.notna(), None)
+            rows = batch.itertuples(index=False, name=None)
+            if row_fills is None:
+                for row in rows:
+                    ws.append(row)
+                continue
+            for row, fill in zip(rows, row_fills[start:start + self.BATCH_SIZE]):
+                if fill is None:
+                    ws.append(row)
+                else:
+                    if id(fill) not in styles:
+                        probe = WriteOnlyCell(ws)
+                        probe.fill = fill
+                        styles[id(fill)] = probe._style
+                    style = styles[id(fill)]
+                    cells = []
+                    for value in row:
+                        cell = WriteOnlyCell(ws, value=value)
+                        cell._style = style
+                        cells.append(cell)
+                    ws.append(cells)
+        self.rows_written[sheet_name] += len(df)
+
+    def add_conditional_formatting(self, sheet_name, cell_range, rule):
+        """
+        Adds a conditional-formatting rule; unlike fills, this costs the same
+        whatever the number of rows.
+
+        :param cell_range: Range the rule applies to, e.g. "A2:K5000".
+        :param rule: openpyxl rule, e.g. a FormulaRule.
+        """
+        ws, _ = self._sheets[sheet_name]
+        ws.conditional_formatting.add(cell_range, rule)
+
+    def append_records(self, records, sheet_name="Sheet1", columns=None):
+        """
+        Appends a batch of dict rows.
+
+        :param records: Iterable of dicts keyed by column name; missing keys are left empty.
+        :param sheet_name: Target sheet, created on first use.
+        :param columns: Header for a new sheet; defaults to the keys of the first record.
+        """
+        records = iter(records)
+        if sheet_name in self._pending:
+            self._hold_back(sheet_name, None, ("records", list(records), None))
+            return
+        if sheet_name not in self._sheets:
+            first = next(records, None)
+            if first is None:
+                return
+            records = [first, *records]
+            columns = columns or list(first)
+            if self._hold_back(sheet_name, columns, ("records", records, None)):
+                return
+            ws, columns = self._sheet(sheet_name, columns)
+        else:
+            ws, columns = self._sheets[sheet_name]
+
+        count = 0
+        for record in records:
+            ws.append([self._cell_value(record.get(column)) for column in columns])
+            count += 1
+        self.rows_written[sheet_name] += count
+
+    def close(self):
+        """
+        Writes the workbook to output_file. A write-only workbook can only be saved once.
+        """
+        for sheet_name in list(self._pending):
+            self._flush(sheet_name)
+        if not self._sheets:
+            self.wb.create_sheet(title="Sheet1")
+        self.wb.save(self.output_file)
+
+    def discard(self):
+        """
+        Drops the workbook without writing output_file, e.g. after a failed
+        export. Each sheet's row stream is closed and its temporary file removed.
+        """
+        self._pending.clear()
+        for ws in self.wb.worksheets:
+            writer = ws._writer
+            if writer is None:  # nothing streamed to this sheet yet
+                continue
+            if ws._rows is not None:
+                ws._rows.close()
+            writer.close()
+            if os.path.exists(writer.out):
+                os.remove(writer.out)
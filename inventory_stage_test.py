@@ -0,0 +1,59 @@
+import importlib
+import os
+import tempfile
+import time
+from decimal import Decimal
+import pandas as pd
+from config_reader import ConfigReader
+from database import Database
+from excel_helper import StreamingExcelWriter
+from stage_store import StageWriter
+
+# Checks that 2010_inventory_classificaiton reads the same inventory frame from
+# the stage as from the export workbook when the workbook is newer than the
+# stage (e.g. edited by hand). Runs against a scratch migration.db.
+classification = importlib.import_module("2010_inventory_classificaiton")
+
+ROWS = [
+    {"itemNumber": "CAR100", "RWARE#": "01", "RROLL#": "1241002", "RLOC1": "A-01", "RONHAN": Decimal(1000) / Decimal(3),
+     "RLASTC": Decimal("6.997397671876075312"), "RLRCTD": 1241002, "RUM": "SF", "basic_uom_qty": 10 / 3},
+    {"itemNumber": "VCT200", "RWARE#": "01", "RROLL#": None, "RLOC1": "B-02", "RONHAN": Decimal("12"),
+     "RLASTC": Decimal("0.1") + Decimal("0.2"), "RLRCTD": 1241003, "RUM": "CT", "basic_uom_qty": 45.0},
+    {"itemNumber": "12345", "RWARE#": "03", "RROLL#": "77", "RLOC1": None, "RONHAN": Decimal(1) / Decimal(7),
+     "RLASTC": None, "RLRCTD": 1240101, "RUM": "SY", "basic_uom_qty": 1 / 7 * 1e-6},
+]
+
+
+def write_export(input_path, suffix):
+    # As 2000_inventory_prep_multithread does: workbook first, then the stage
+    with StageWriter("inventory", suffix) as stage:
+        with StreamingExcelWriter(input_path, autosize=True) as writer:
+            writer.append_records(ROWS)
+        stage.append_records(ROWS)
+
+
+def test_stage_and_workbook_give_the_same_frame():
+    with tempfile.TemporaryDirectory() as scratch:
+        config = ConfigReader.get_instance()
+        config.config.set("PATHS", "db_path", os.path.join(scratch, "migration.db"))
+        Database._default_db_path = None
+        input_path = os.path.join(scratch, "inventory_t.xlsx")
+        try:
+            write_export(input_path, "t")
+            from_stage = classification.load_inventory(input_path, "t")
+
+            # A workbook newer than the stage is read instead of it
+            later = time.time() + 60
+            os.utime(input_path, (later, later))
+            from_workbook = classification.load_inventory(input_path, "t")
+        finally:
+            Database.close_all()
+            Database._default_db_path = None
+
+        assert from_stage["RWARE#"].tolist() == ["01", "01", "03"]
+        pd.testing.assert_frame_equal(from_stage, from_workbook)
+
+
+if __name__ == "__main__":
+    test_stage_and_workbook_give_the_same_frame()
+    print("✅ Stage and workbook give the same inventory frame")
@@ -0,0 +1,46 @@
+import importlib
+import pandas as pd
+from path_manager import PathManager
+
+# Checks that 2020_inventory_colorize_v4 builds the same LOT# from the stage
+# written by 2010_inventory_classificaiton as from the classified workbook.
+# Run it after 2010 and before colorize_v4 (which skips sheets that already have LOT#).
+colorize = importlib.import_module("2020_inventory_colorize_v4")
+
+
+def lot_numbers(sheets):
+    lots = {}
+    for sheet_name, df in sheets.items():
+        out, _ = colorize.add_lot_and_cost_columns(df.copy(), sheet_name)
+        if out is not None:
+            lots[sheet_name] = out["LOT#"].reset_index(drop=True)
+    return lots
+
+
+def main():
+    suffix = input("Enter the suffix used for the classified inventory file: ").strip().replace(" ", "_") or "classified"
+    path_manager = PathManager()
+    file_path = path_manager.get_path("PATHS", "inventory_classified_path", suffix=suffix, check_path=False)
+
+    from_stage = lot_numbers(colorize.read_sheets(file_path, suffix))
+    from_excel = lot_numbers(colorize.read_sheets(file_path))
+    if not from_stage:
+        print(f"❌ No stage sheets with lots for '{suffix}'")
+        return
+
+    mismatches = 0
+    for sheet_name, stage_lots in from_stage.items():
+        excel_lots = from_excel.get(sheet_name, pd.Series(dtype=object))
+        diff = stage_lots.ne(excel_lots.reindex(stage_lots.index))
+        mismatches += int(diff.sum()) + abs(len(stage_lots) - len(excel_lots))
+        for idx in diff[diff].index[:5]:
+            print(f"⚠️ {sheet_name} row {idx + 2}: stage {stage_lots[idx]!r} vs Excel {excel_lots.get(idx)!r}")
+
+    if mismatches:
+        print(f"❌ {mismatches} LOT# values differ between the stage and {file_path}")
+    else:
+        print(f"✅ LOT# matches on {sum(len(lots) for lots in from_stage.values())} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,20 @@ class PathManager:
 
         return full_path
 
+    def get_shard_paths(self, section, key, count, check_path=True, **format_kwargs):
+        """
+        Paths of the `count` files an output is split into: get_path() with a
+        sequence number after the file name, e.g.
+        output/API_MMS310MI_Update_20250101_120000_001.xlsx. All files share one timestamp.
+        """
+        path = self.get_path(section, key, check_path=check_path, **format_kwargs)
+        if path is None:
+            return None
+
+        digits = max(3, len(str(count)))
+        return [path.with_name(f"{path.stem}_{sequence:0{digits}d}{path.suffix}")
+                for sequence in range(1, count + 1)]
+
     def get_template_path(self, template_name):
         template_base_path = "templates"
         template_path = Path(template_base_path) / template_name
@@ -0,0 +1,341 @@
+import math
+import os
+import re
+import time
+import uuid
+from decimal import Decimal
+import pandas as pd
+from database import Database
+
+# Typed copies of the DataFrames the inventory stages hand to each other, kept
+# next to the Excel files so the next stage does not have to re-parse XLSX.
+# One table per sheet; dtypes and sheet order live in STAGE_COLUMNS_TABLE.
+STAGE_COLUMNS_TABLE = "stage_columns"
+
+# Stages not rewritten for this long are dropped by prune_stages (run whenever a
+# stage is published); loading one afterwards just falls back to its workbook
+STAGE_RETENTION_DAYS = 30
+
+
+def stage_key(name, suffix):
+    return f"{name}__{re.sub(r'[^0-9A-Za-z_]', '_', suffix)}"
+
+
+def _ensure_columns_table(db):
+    db.execute(f"""
+        CREATE TABLE IF NOT EXISTS {STAGE_COLUMNS_TABLE} (
+            stage TEXT NOT NULL,
+            sheet TEXT NOT NULL,
+            sheet_order INTEGER NOT NULL,
+            table_name TEXT NOT NULL,
+            column_name TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            dtype TEXT NOT NULL,
+            written_at REAL NOT NULL,
+            PRIMARY KEY (stage, sheet, position)
+        )
+    """)
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _column_kind(series):
+    """
+    dtype recorded for a column; numeric object columns holding Decimals
+    (UOMService results, possibly mixed with untouched floats) are tagged
+    'decimal' so they come back as Decimal instead of text.
+    """
+    if series.dtype == object:
+        values = series.dropna()
+        if any(isinstance(v, Decimal) for v in values) \
+                and all(isinstance(v, (Decimal, int, float)) and not isinstance(v, bool) for v in values):
+            return "decimal"
+    return str(series.dtype)
+
+
+def _workbook_number(value):
+    # What a numeric cell holds once saved: openpyxl writes 16 significant digits
+    return "%.16g" % value
+
+
+def _encode(df, kinds):
+    # Numbers are stored as the matching workbook holds them, so reading the
+    # stage or the workbook gives the same values
+    df = df.astype(object)
+    for column, kind in kinds.items():
+        if kind == "decimal":
+            df[column] = df[column].map(lambda v: None if pd.isna(v) else str(Decimal(_workbook_number(v))))
+        elif kind.startswith("datetime64"):
+            df[column] = df[column].map(lambda v: None if pd.isna(v) else v.isoformat())
+        elif kind.startswith("float"):
+            df[column] = df[column].map(lambda v: v if pd.isna(v) else float(_workbook_number(v)))
+        else:
+            # sqlite3 cannot bind Decimal; one showing up after the first batch is stored as float
+            df[column] = df[column].map(lambda v: float(_workbook_number(v)) if isinstance(v, Decimal) else v)
+    return df.where(df.notna(), None)
+
+
+def _decode(df, kinds):
+    for column, kind in kinds.items():
+        if kind == "decimal":
+            df[column] = df[column].map(lambda v: None if v is None else Decimal(v)).astype(object)
+        elif kind.startswith("datetime64"):
+            df[column] = pd.to_datetime(df[column])
+        else:
+            try:
+                df[column] = df[column].astype(kind)
+            except (TypeError, ValueError):
+                # e.g. an int64 first batch followed by batches with blanks;
+                # keep what SQLite handed back
+                pass
+    return df
+
+
+def _decode_text(df, kinds):
+    """
+    _decode() for text read back from the workbook with pd.read_excel(dtype=str).
+    Text columns, and columns the stage does not know, stay text.
+    """
+    for column in df.columns:
+        kind = kinds.get(column, "object")
+        values = df[column]
+        if kind == "object":
+            df[column] = values.where(values.notna(), None)
+        elif kind == "decimal":
+            df[column] = values.map(lambda v: None if pd.isna(v) else Decimal(v)).astype(object)
+        elif kind.startswith("datetime64"):
+            df[column] = pd.to_datetime(values)
+        elif kind == "bool":
+            df[column] = values.map({"True": True, "False": False})
+        else:
+            df[column] = pd.to_numeric(values)
+            try:
+                df[column] = df[column].astype(kind)
+            except (TypeError, ValueError):
+                # blanks in an int64 column, as on the stage side
+                pass
+    return df
+
+
+def _excel_text(value):
+    # Mirrors pd.read_excel(dtype=str) on the matching workbook: numbers are
+    # rounded to the 16 significant digits openpyxl writes, integral ones lose
+    # their ".0", empty cells (and NaN / inf, which openpyxl leaves empty) stay NaN
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return float("nan")
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        if isinstance(value, int) and abs(value) < 10 ** 16:
+            return str(value)
+        number = float("%.16g" % value)
+        if not math.isfinite(number):
+            return float("nan")
+        return str(int(number)) if number.is_integer() else str(number)
+    return str(value)
+
+
+def prune_stages(db, retention_days=STAGE_RETENTION_DAYS):
+    """
+    Drops stages last written more than `retention_days` ago, and stage tables
+    no stage refers to any more (e.g. left behind by an interrupted run).
+    """
+    cutoff = time.time() - retention_days * 86400
+    expired = db.execute(
+        f"SELECT stage FROM {STAGE_COLUMNS_TABLE} GROUP BY stage HAVING MAX(written_at) < ?", (cutoff,)
+    ).fetchall()
+    for row in expired:
+        db.execute(f"DELETE FROM {STAGE_COLUMNS_TABLE} WHERE stage = ?", (row["stage"],))
+
+    orphans = db.execute(
+        f"SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'stage\\_%' ESCAPE '\\' "
+        f"AND name != ? AND name NOT IN (SELECT table_name FROM {STAGE_COLUMNS_TABLE})",
+        (STAGE_COLUMNS_TABLE,)
+    ).fetchall()
+    for row in orphans:
+        db.execute(f"DROP TABLE IF EXISTS {_quote(row['name'])}")
+
+
+class StageWriter:
+    """
+    Writes one pipeline stage into SQLite, sheet by sheet, with the same
+    append_frame / append_records interface as StreamingExcelWriter.
+    Column dtypes are taken from the first batch of each sheet.
+
+    Every batch is committed on its own, so other writers are never blocked
+    for long. The rows go to tables registered under a pending key that
+    load_stage does not see; closing the writer without error swaps them in
+    for the previous copy of the stage in one short transaction, and an error
+    drops them. Close it after the matching workbook is saved (see
+    load_stage's newer_than). Closing also prunes expired stages, see
+    prune_stages; tables of a run that was killed expire the same way.
+    """
+
+    def __init__(self, name, suffix):
+        self.stage = stage_key(name, suffix)
+        # stage_key() never yields "#", so the pending key cannot clash with a stage
+        self._token = uuid.uuid4().hex[:8]
+        self._pending = f"{self.stage}#{self._token}"
+        self._sheets = {}  # sheet name -> (table, columns, kinds)
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def close(self):
+        """Publishes the stage in place of the previous copy."""
+        if self._closed:
+            return
+        self._closed = True
+        with Database() as db:
+            _ensure_columns_table(db)
+            old_tables = [
+                row["table_name"] for row in db.execute(
+                    f"SELECT DISTINCT table_name FROM {STAGE_COLUMNS_TABLE} WHERE stage = ?", (self.stage,)
+                ).fetchall()
+            ]
+            db.execute(f"DELETE FROM {STAGE_COLUMNS_TABLE} WHERE stage = ?", (self.stage,))
+            for table in old_tables:
+                db.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+            # Stamped here, so a workbook saved before this is not newer than the stage
+            db.execute(
+                f"UPDATE {STAGE_COLUMNS_TABLE} SET stage = ?, written_at = ? WHERE stage = ?",
+                (self.stage, time.time(), self._pending)
+            )
+            prune_stages(db)
+
+    def discard(self):
+        """Drops what was written so far; the previous copy of the stage is kept."""
+        if self._closed:
+            return
+        self._closed = True
+        if not self._sheets:
+            return
+        with Database() as db:
+            db.execute(f"DELETE FROM {STAGE_COLUMNS_TABLE} WHERE stage = ?", (self._pending,))
+            for table, _, _ in self._sheets.values():
+                db.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+
+    def _sheet(self, db, sheet_name, df):
+        if sheet_name not in self._sheets:
+            order = len(self._sheets)
+            table = f"stage_{self.stage}__{self._token}__{order}"
+            kinds = {column: _column_kind(df[column]) for column in df.columns}
+            _ensure_columns_table(db)
+            # Untyped columns, so SQLite keeps every value's own storage class
+            db.execute(f"CREATE TABLE {_quote(table)} ({', '.join(_quote(c) for c in df.columns)})")
+            db.cursor.executemany(
+                f"INSERT INTO {STAGE_COLUMNS_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(self._pending, sheet_name, order, table, str(column), position, kind, time.time())
+                 for position, (column, kind) in enumerate(kinds.items())]
+            )
+            self._sheets[sheet_name] = (table, list(df.columns), kinds)
+        return self._sheets[sheet_name]
+
+    def append_frame(self, df, sheet_name="Sheet1"):
+        with Database() as db:
+            table, columns, kinds = self._sheet(db, sheet_name, df)
+            encoded = _encode(df[columns], kinds)
+            placeholders = ", ".join("?" * len(columns))
+            db.cursor.executemany(
+                f"INSERT INTO {_quote(table)} VALUES ({placeholders})",
+                encoded.itertuples(index=False, name=None)
+            )
+
+    def append_records(self, records, sheet_name="Sheet1", columns=None):
+        records = list(records)
+        if not records:
+            return
+        if sheet_name in self._sheets:
+            columns = self._sheets[sheet_name][1]
+        df = pd.DataFrame(records, columns=columns)
+        self.append_frame(df, sheet_name=sheet_name)
+
+
+def save_stage(name, suffix, sheets):
+    """
+    Stores a stage in one go. `sheets` is a DataFrame or a dict of sheet name -> DataFrame.
+    """
+    if isinstance(sheets, pd.DataFrame):
+        sheets = {"Sheet1": sheets}
+    with StageWriter(name, suffix) as writer:
+        for sheet_name, df in sheets.items():
+            writer.append_frame(df, sheet_name=sheet_name)
+
+
+def _stage_meta(db, stage):
+    exists = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (STAGE_COLUMNS_TABLE,)
+    ).fetchone()
+    if not exists:
+        return None
+    meta = db.fetch_dataframe(
+        f"SELECT sheet, table_name, column_name, dtype, written_at FROM {STAGE_COLUMNS_TABLE} "
+        f"WHERE stage = ? ORDER BY sheet_order, position",
+        (stage,)
+    )
+    return None if meta.empty else meta
+
+
+def load_stage(name, suffix, sheets=None, as_text=False, newer_than=None):
+    """
+    Loads a stage written by StageWriter / save_stage.
+
+    :param sheets: Only load these sheet names (default: all).
+    :param as_text: Return every value as text, like pd.read_excel(dtype=str).
+    :param newer_than: Workbook the stage mirrors; a stage older than that file
+                       (edited or regenerated by another script) is ignored.
+    :return: Dict of sheet name -> DataFrame in the original sheet order, or
+             None when there is no usable stage (callers fall back to Excel).
+    """
+    stage = stage_key(name, suffix)
+    with Database(read_only=True) as db:
+        meta = _stage_meta(db, stage)
+        if meta is None:
+            return None
+        if newer_than is not None and os.path.exists(newer_than) \
+                and os.path.getmtime(newer_than) > meta["written_at"].max():
+            return None
+
+        result = {}
+        for sheet, columns in meta.groupby("sheet", sort=False):
+            if sheets is not None and sheet not in sheets:
+                continue
+            table = columns["table_name"].iloc[0]
+            df = pd.read_sql_query(f"SELECT * FROM {_quote(table)}", db.conn)
+            df.columns = list(columns["column_name"])
+            df = _decode(df, dict(zip(columns["column_name"], columns["dtype"])))
+            if as_text:
+                df = df.astype(object).apply(lambda column: column.map(_excel_text)).astype(object)
+            result[sheet] = df
+        return result
+
+
+def load_workbook_as_stage(name, suffix, workbook_path):
+    """
+    Reads the workbook a stage mirrors with the column dtypes recorded for the
+    stage, e.g. when the workbook was edited after the stage was written, so
+    the frames are typed as load_stage would have returned them.
+    :return: Dict of sheet name -> DataFrame in the stage's sheet order, or
+             None when the stage was never written or the workbook is missing.
+    """
+    stage = stage_key(name, suffix)
+    with Database(read_only=True) as db:
+        meta = _stage_meta(db, stage)
+    if meta is None or not os.path.exists(workbook_path):
+        return None
+
+    result = {}
+    with pd.ExcelFile(workbook_path, engine="openpyxl") as xls:
+        for sheet, columns in meta.groupby("sheet", sort=False):
+            if sheet not in xls.sheet_names:
+                continue
+            df = pd.read_excel(xls, sheet_name=sheet, dtype=str)
+            result[sheet] = _decode_text(df, dict(zip(columns["column_name"], columns["dtype"])))
+    return result
@@ -1,9 +1,185 @@
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
 import pandas as pd
 from config_reader import ConfigReader
 from path_manager import PathManager
 from pathlib import Path
-from openpyxl import load_workbook
+import openpyxl
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles.named_styles import NamedStyleList
+from openpyxl.utils.indexed_list import IndexedList
+from openpyxl.utils import column_index_from_string
+from openpyxl.worksheet.dimensions import ColumnDimension, RowDimension
+
+# Workbook style tables; stamped copies of a template get the template's own,
+# so the style ids recorded for its cells and dimensions stay valid
+STYLE_TABLES = ("_fonts", "_fills", "_borders", "_alignments", "_protections", "_number_formats", "_cell_styles")
+
+# Those tables, like the named styles, theme and style ids (cell._style) used
+# alongside them, are openpyxl internals. They are only used on the openpyxl
+# releases template_layout_test.py was run against; other releases (or one
+# lacking any of them) get the layout's public-attribute fallback
+STAMP_ATTRIBUTES = STYLE_TABLES + ("_named_styles", "loaded_theme")
+STAMPING_OPENPYXL_RELEASES = {(3, 1)}
+CELL_STYLE_ATTRIBUTES = ("font", "fill", "border", "alignment", "number_format", "protection")
+
+# DataFrame rows converted to cell values at a time by save_rows
+FRAME_CHUNK_ROWS = 10000
+
+# Worksheet attributes carried over from a template as they are
+SHEET_SETTINGS = ("sheet_properties", "sheet_format", "views", "page_margins", "page_setup", "print_options")
+
+# Parsed templates, see load_template_layout: resolved path -> (mtime, TemplateLayout)
+_layouts = {}
+_layouts_lock = threading.Lock()
+
+# [MAX_ROWS] in config.ini: output path key -> data rows per file; unlisted outputs are never split
+MAX_ROWS_SECTION = "MAX_ROWS"
+
+
+def stamping_supported():
+    release = tuple(int(part) for part in openpyxl.__version__.split(".")[:2])
+    return release in STAMPING_OPENPYXL_RELEASES
+
+
+def map_columns(ws):
+    # the first row contains column names
+    return {cell.value: cell.column_letter for cell in ws[1]}
+
+
+class TemplateLayout:
+    """
+    Everything needed to recreate an API template, parsed once: the header map
+    of its active sheet, the style tables and, for every sheet, the sheet
+    settings, dimensions, data validations and cells with their style ids.
+    new_workbook() stamps out fresh copies, editable or write-only, without
+    touching the .xlsx again.
+
+    On an openpyxl release outside STAMPING_OPENPYXL_RELEASES, or one that
+    lacks the internals this relies on (STAMP_ATTRIBUTES, cell._style),
+    editable copies are reloaded from `template_path` and write-only ones get
+    each cell's public style attributes instead.
+    """
+
+    def __init__(self, wb, template_path=None):
+        ws = wb.active
+        self.template_path = template_path
+        self.stamped = stamping_supported() and all(hasattr(wb, attr) for attr in STAMP_ATTRIBUTES) \
+            and hasattr(Cell, "_style")
+        self.column_map = map_columns(ws)
+        self.max_column = ws.max_column
+        self.template_rows = ws.max_row
+        self.active_index = wb.worksheets.index(ws)
+        if self.stamped:
+            self.theme = wb.loaded_theme
+            self.style_tables = {attr: list(getattr(wb, attr)) for attr in STYLE_TABLES}
+            self.named_styles = list(wb._named_styles)
+        self.sheets = [self._describe(sheet) for sheet in wb.worksheets]
+
+    def _style(self, obj):
+        if self.stamped:
+            return copy(obj._style)
+        if isinstance(obj, Cell):
+            return {attr: copy(getattr(obj, attr)) for attr in CELL_STYLE_ATTRIBUTES}
+        return None
+
+    def _apply_style(self, obj, style):
+        if self.stamped:
+            obj._style = copy(style)
+        elif style is not None:
+            for attr, value in style.items():
+                setattr(obj, attr, copy(value))
+
+    def _describe(self, ws):
+        return {
+            "title": ws.title,
+            "settings": {attr: copy(getattr(ws, attr)) for attr in SHEET_SETTINGS},
+            "columns": [
+                (key, dict(index=dim.index, width=dim.width, bestFit=dim.bestFit, hidden=dim.hidden,
+                           outlineLevel=dim.outlineLevel, collapsed=dim.collapsed, min=dim.min, max=dim.max,
+                           customWidth=dim.customWidth), self._style(dim))
+                for key, dim in ws.column_dimensions.items()
+            ],
+            "rows": [
+                (idx, dict(index=idx, ht=dim.ht, customHeight=dim.customHeight, hidden=dim.hidden,
+                           outlineLevel=dim.outlineLevel, collapsed=dim.collapsed), self._style(dim))
+                for idx, dim in ws.row_dimensions.items()
+            ],
+            "validations": [copy(dv) for dv in ws.data_validations.dataValidation],
+            "cells": [[(cell.value, self._style(cell)) for cell in row] for row in ws.iter_rows()],
+        }
+
+    def new_workbook(self, write_only=False):
+        """
+        :return: (workbook, active sheet). With write_only=True the sheets are
+                 write-only and data rows can be appended to the active one.
+        """
+        if not self.stamped and not write_only and self.template_path is not None:
+            wb = load_workbook(self.template_path)
+            return wb, wb.active
+
+        wb = Workbook(write_only=write_only)
+        if not write_only:
+            wb.remove(wb.active)
+        if self.stamped:
+            wb.loaded_theme = self.theme
+            for attr, items in self.style_tables.items():
+                setattr(wb, attr, IndexedList(items))
+            wb._named_styles = NamedStyleList(self.named_styles)
+
+        for sheet in self.sheets:
+            ws = wb.create_sheet(sheet["title"])
+            for attr, value in sheet["settings"].items():
+                setattr(ws, attr, copy(value))
+            for key, dim, style in sheet["columns"]:
+                ws.column_dimensions[key] = ColumnDimension(ws, **dim)
+                self._apply_style(ws.column_dimensions[key], style)
+            for idx, dim, style in sheet["rows"]:
+                ws.row_dimensions[idx] = RowDimension(ws, **dim)
+                self._apply_style(ws.row_dimensions[idx], style)
+            for dv in sheet["validations"]:
+                ws.data_validations.append(copy(dv))
+
+            for row_idx, row in enumerate(sheet["cells"], start=1):
+                cells = []
+                for col_idx, (value, style) in enumerate(row, start=1):
+                    cell = WriteOnlyCell(ws, value) if write_only else ws.cell(row=row_idx, column=col_idx, value=value)
+                    self._apply_style(cell, style)
+                    cells.append(cell)
+                if write_only:
+                    ws.append(cells)
+
+        wb.active = self.active_index
+        return wb, wb.worksheets[self.active_index]
+
+
+def load_template_layout(template_path):
+    """
+    Process-wide cache of parsed templates, keyed by path and refreshed when
+    the file changes, so repeated or sharded fills parse each template once.
+    """
+    key = str(Path(template_path).resolve())
+    mtime = os.path.getmtime(template_path)
+    with _layouts_lock:
+        cached = _layouts.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    print(f"Loading template from {template_path}")
+    layout = TemplateLayout(load_workbook(template_path), template_path)
+    with _layouts_lock:
+        _layouts[key] = (mtime, layout)
+    return layout
+
+
+def write_shard(template_name, rows, output_path):
+    """Writes one file of a split output from a fresh copy of the template; runs in a worker process."""
+    TemplateHelper(template_name).write_rows(rows, output_path)
+    return output_path
+
 
 class TemplateHelper:
     def __init__(self, template_name):
@@ -13,21 +189,23 @@ class TemplateHelper:
         if not os.path.exists(template_path):
             raise FileNotFoundError(f"Template file {template_path} not found")
 
-        print(f"Loading template from {template_path}")
-        self.wb = load_workbook(template_path)
-        self.ws = self.wb.active
-        self.column_map = self._map_columns()
+        self.template_name = template_name
+        self.layout = load_template_layout(template_path)
+        self.column_map = self.layout.column_map
+        self.template_rows = self.layout.template_rows
         self.data_start_row = 4
+        self._wb = None
 
-    def _map_columns(self):
-        # the first row contains column names
-        column_map = {}
-        for col in range(1, self.ws.max_column + 1):
-            column_name = self.ws.cell(row=1, column=col).value
-            cell_name = self.ws.cell(row=1, column=col).column_letter
-            column_map[column_name] = cell_name
+    @property
+    def wb(self):
+        # Editable copy for add_row / add_all_rows / save, only stamped out when used
+        if self._wb is None:
+            self._wb, _ = self.layout.new_workbook()
+        return self._wb
 
-        return column_map
+    @property
+    def ws(self):
+        return self.wb.active
 
     def add_row(self, data):
         row = self.ws.max_row + 1
@@ -50,4 +228,92 @@ class TemplateHelper:
         path_manager = PathManager()
         output_path = path_manager.get_path("PATHS", output_file)
         print(f"Saving to {output_path}")
-        self.wb.save(output_path)
\ No newline at end of file
+        self.wb.save(output_path)
+
+    def save_rows(self, rows, output_file):
+        """
+        Bulk fill for large documents: writes the template (header rows and any
+        rows added so far) followed by `rows` through a write-only workbook, so
+        time and memory grow linearly with the row count. Outputs with a row
+        limit in [MAX_ROWS] are split into numbered files written in parallel.
+        :param rows: List of dicts or a DataFrame, keyed by template column name.
+        :param output_file: PATHS key of the output file, as for save().
+        :return: List of the files written.
+        """
+        shards = self.split_output(rows, output_file)
+        if len(shards) == 1:
+            output_path, rows = shards[0]
+            self.write_rows(rows, output_path)
+            return [output_path]
+
+        workers = min(os.cpu_count() or 1, len(shards))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(write_shard, self.template_name, shard_rows, output_path)
+                       for output_path, shard_rows in shards]
+            return [future.result() for future in futures]
+
+    def split_output(self, rows, output_file):
+        """
+        Splits `rows` by the [MAX_ROWS] limit of `output_file`.
+        :return: List of (output path, rows) pairs; a single pair with the
+                 plain output path when no split is needed.
+        """
+        config = ConfigReader.get_instance()
+        path_manager = PathManager()
+        max_rows = int(config.get(MAX_ROWS_SECTION, output_file, fallback=0) or 0)
+        if not max_rows or len(rows) <= max_rows:
+            return [(path_manager.get_path("PATHS", output_file), rows)]
+
+        if self._wb is not None and self.ws.max_row > self.template_rows:
+            raise ValueError("Rows added with add_row/add_all_rows cannot be split across files; "
+                             "pass every row to save_rows")
+
+        starts = range(0, len(rows), max_rows)
+        output_paths = path_manager.get_shard_paths("PATHS", output_file, len(starts))
+        if isinstance(rows, pd.DataFrame):
+            return [(path, rows.iloc[start:start + max_rows]) for path, start in zip(output_paths, starts)]
+        return [(path, rows[start:start + max_rows]) for path, start in zip(output_paths, starts)]
+
+    def write_rows(self, rows, output_path):
+        """Streams the template plus `rows` into a single file at `output_path`, see save_rows."""
+        print(f"Saving to {output_path}")
+
+        # Rows added with add_row / add_all_rows are part of the editable copy
+        layout = self.layout if self._wb is None else TemplateLayout(self._wb)
+        row_values = self._row_values(rows)
+        wb, ws = layout.new_workbook(write_only=True)
+        for values in row_values:
+            ws.append(values)
+        wb.save(output_path)
+
+    def _row_values(self, rows):
+        """
+        Iterator over one list of cell values per row, in template column order.
+        DataFrame columns are checked up front, before anything is written.
+        """
+        positions = {name: column_index_from_string(letter) - 1 for name, letter in self.column_map.items()}
+        width = self.layout.max_column
+
+        if isinstance(rows, pd.DataFrame):
+            for column_name in rows.columns:
+                if column_name not in positions:
+                    raise ValueError(f"Column name {column_name} not found in template")
+            frame = rows.set_axis([positions[c] for c in rows.columns], axis=1)
+
+            def frame_rows():
+                # Converted chunk by chunk, so a full-width object copy of the frame never exists
+                for start in range(0, len(frame), FRAME_CHUNK_ROWS):
+                    chunk = frame.iloc[start:start + FRAME_CHUNK_ROWS].reindex(columns=range(width)).astype(object)
+                    chunk = chunk.where(chunk.notna(), None)
+                    yield from (list(values) for values in chunk.itertuples(index=False, name=None))
+            return frame_rows()
+
+        def dict_rows():
+            for data in rows:
+                values = [None] * width
+                for column_name, value in data.items():
+                    if column_name not in positions:
+                        raise ValueError(f"Column name {column_name} not found in template")
+                    values[positions[column_name]] = value
+                yield values
+        return dict_rows()
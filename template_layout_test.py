@@ -0,0 +1,74 @@
+import os
+import tempfile
+from copy import copy
+import openpyxl
+from openpyxl import load_workbook
+from template_helper import CELL_STYLE_ATTRIBUTES, STAMP_ATTRIBUTES, TemplateLayout
+
+# Checks that workbooks stamped from a TemplateLayout through openpyxl's
+# internals read back with the same styles as the template itself, editable
+# and write-only. Stamping is forced on, so running this on a new openpyxl
+# release tells whether it can join STAMPING_OPENPYXL_RELEASES.
+TEMPLATE_DIR = "templates"
+
+# Row past the template's own rows: an untouched cell shows the workbook's default style
+BLANK_ROW = 50
+
+
+def cell_styles(cell):
+    # copy() turns openpyxl's style proxies into plain, comparable style objects
+    return {attr: copy(getattr(cell, attr)) for attr in CELL_STYLE_ATTRIBUTES}
+
+
+def sheet_layout(ws):
+    # Write-only sheets only save the dimensions of rows that were written
+    rows = ws.max_row
+    return {
+        "cells": [[(cell.value, cell_styles(cell)) for cell in row] for row in ws.iter_rows()],
+        "blank": cell_styles(ws.cell(row=BLANK_ROW, column=1)),
+        "columns": {key: (dim.width, dim.hidden, dimension_styles(dim))
+                    for key, dim in ws.column_dimensions.items()},
+        "rows": {idx: (dim.height, dim.hidden) for idx, dim in ws.row_dimensions.items() if idx <= rows},
+        "validations": sorted(str(dv.sqref) for dv in ws.data_validations.dataValidation),
+        "freeze_panes": ws.freeze_panes,
+    }
+
+
+def dimension_styles(dim):
+    return copy(dim.font), copy(dim.fill), dim.number_format
+
+
+def stamped_copy(template_path, write_only, scratch):
+    layout = TemplateLayout(load_workbook(template_path), template_path)
+    assert all(hasattr(load_workbook(template_path), attr) for attr in STAMP_ATTRIBUTES), \
+        f"openpyxl {openpyxl.__version__} lacks the stamping internals"
+    layout.stamped = True
+    wb, _ = layout.new_workbook(write_only=write_only)
+    output_path = os.path.join(scratch, f"{'write_only' if write_only else 'editable'}.xlsx")
+    wb.save(output_path)
+    return load_workbook(output_path)
+
+
+def check_template(template_path):
+    with tempfile.TemporaryDirectory() as scratch:
+        for write_only in (False, True):
+            # Reloaded each time: reading the blank cell adds it to the sheet
+            expected = load_workbook(template_path)
+            stamped = stamped_copy(template_path, write_only, scratch)
+            assert stamped.sheetnames == expected.sheetnames
+            assert stamped.active.title == expected.active.title
+            for name in expected.sheetnames:
+                assert sheet_layout(stamped[name]) == sheet_layout(expected[name]), \
+                    f"{template_path} ({'write-only' if write_only else 'editable'}), sheet {name}"
+
+
+def test_stamped_templates_match_load_workbook():
+    templates = sorted(name for name in os.listdir(TEMPLATE_DIR) if name.endswith(".xlsx"))
+    assert templates
+    for name in templates:
+        check_template(os.path.join(TEMPLATE_DIR, name))
+
+
+if __name__ == "__main__":
+    test_stamped_templates_match_load_workbook()
+    print(f"✅ Stamped templates match their files on openpyxl {openpyxl.__version__}")
@@ -1,37 +1,142 @@
-
 import importlib
+import pandas as pd
 import yaml
+from transformers.base import BaseTransformer
+
+
+class FrameRow:
+    """
+    Row handed to row-only transformer methods by transform_frame. Same
+    contract as the scripts' RowWrapper: NaN reads as "", a missing column
+    raises AttributeError so getattr(row, name, default) falls back.
+    """
+    __slots__ = ("_record",)
+
+    def __init__(self, record):
+        self._record = record
+
+    def __getattr__(self, name):
+        try:
+            val = self._record[name]
+        except KeyError:
+            raise AttributeError(f"{name!r} not found in row") from None
+        return "" if pd.isna(val) else val
+
 
 class TransformerFactory:
     def __init__(self, mapping_file_path):
         with open(mapping_file_path, 'r') as f:
             self.mapping = yaml.safe_load(f)
+        # document type -> compiled plan, see compile()
+        self._plans = {}
+
+    @staticmethod
+    def load_class(path):
+        module_path, class_name = path.rsplit('.', 1)
+        module = importlib.import_module(module_path)
+        return getattr(module, class_name)
 
     def build_transformers(self, class_paths, row):
-        instances = []
-        for path in class_paths:
-            module_path, class_name = path.rsplit('.', 1)
-            module = importlib.import_module(module_path)
-            cls = getattr(module, class_name)
-            instances.append(cls(row))
-        return instances
+        return [self.load_class(path)(row) for path in class_paths]
+
+    def compile(self, document_type):
+        """
+        Resolves a document type once into (classes, fields): the transformer
+        classes it needs, and for every field the index of the class providing
+        it, the plain function to call on that class's instance, and the
+        column version of that function (None when there is none).
+        """
+        plan = self._plans.get(document_type)
+        if plan is not None:
+            return plan
 
-    def transform_row(self, document_type, row):
         doc_def = self.mapping.get(document_type)
         if not doc_def:
             raise ValueError(f"No mapping found for document type: {document_type}")
 
-        transformer_instances = self.build_transformers(doc_def['transformers'], row)
-        field_mappings = doc_def['fields']
-        result = {}
-
-        for field, method_name in field_mappings.items():
-            for transformer in transformer_instances:
-                method = getattr(transformer, method_name, None)
+        classes = [self.load_class(path) for path in doc_def['transformers']]
+        used = {}  # index in doc_def['transformers'] -> index in plan classes
+        fields = []
+        for field, method_name in doc_def['fields'].items():
+            # First transformer in the list that has the method wins
+            for idx, cls in enumerate(classes):
+                method = getattr(cls, method_name, None)
                 if method:
-                    result[field] = method()
+                    column_method = self._column_method(cls, method_name)
+                    fields.append((field, used.setdefault(idx, len(used)), method, column_method))
                     break
             else:
                 raise AttributeError(f"Method {method_name} not found in any transformer for {document_type}")
 
-        return result
+        plan = ([classes[idx] for idx in used], fields)
+        self._plans[document_type] = plan
+        return plan
+
+    @staticmethod
+    def _column_method(cls, method_name):
+        # Only a column version defined next to the row method that won counts,
+        # so a subclass overriding the row method never picks up its parent's column version
+        column_name = method_name + BaseTransformer.COLUMN_SUFFIX
+        for klass in cls.__mro__:
+            if method_name in vars(klass):
+                return getattr(cls, column_name) if column_name in vars(klass) else None
+        return None
+
+    def transform_row(self, document_type, row):
+        classes, fields = self.compile(document_type)
+        transformer_instances = [cls(row) for cls in classes]
+        return {field: method(transformer_instances[idx]) for field, idx, method, _ in fields}
+
+    def transform_frame(self, document_type, df):
+        """
+        Transforms a whole DataFrame at once. Fields whose transformer has a
+        column version are computed on the full columns; the remaining fields
+        fall back to the row methods, called on FrameRow rows.
+        :return: DataFrame with one column per mapped field, in mapping order,
+                 on the same index as `df`.
+        """
+        return self.transform_frames([document_type], df)[document_type]
+
+    def transform_frames(self, document_types, df):
+        """
+        transform_frame for several document types over the same rows. A
+        transformer method shared by several documents (get_item_number,
+        get_facility, ...) is evaluated once and its result reused.
+        :return: Dict of document type -> DataFrame, as transform_frame.
+        """
+        plans = {document_type: self.compile(document_type) for document_type in document_types}
+
+        values = {}       # (class, row method) -> Series over df
+        row_methods = {}  # (class, row method) without a column version, in first-use order
+        for classes, fields in plans.values():
+            for _, idx, method, column_method in fields:
+                key = (classes[idx], method)
+                if key in values or key in row_methods:
+                    continue
+                if column_method is None:
+                    row_methods[key] = None
+                    continue
+                result = column_method(df)
+                if isinstance(result, pd.Series):
+                    values[key] = result.reindex(df.index)
+                else:
+                    # Scalar (constant field) or array aligned with df
+                    values[key] = pd.Series(result, index=df.index, dtype=object)
+
+        if row_methods:
+            used = list(dict.fromkeys(cls for cls, _ in row_methods))
+            columns = {key: [] for key in row_methods}
+            for record in df.to_dict("records"):
+                row = FrameRow(record)
+                transformer_instances = {cls: cls(row) for cls in used}
+                for (cls, method), column in columns.items():
+                    column.append(method(transformer_instances[cls]))
+            for key, column in columns.items():
+                values[key] = pd.Series(column, index=df.index, dtype=object)
+
+        return {
+            document_type: pd.DataFrame(
+                {field: values[(classes[idx], method)] for field, idx, method, _ in fields}, index=df.index
+            )
+            for document_type, (classes, fields) in plans.items()
+        }
@@ -1,7 +1,30 @@
+import pandas as pd
+
 
 class BaseTransformer:
+    """
+    Row transformers expose one get_* method per mapped field.
+
+    A transformer may also provide a column version of a field method, named
+    `<method>_column`: a staticmethod taking the whole DataFrame and returning a
+    Series (or a scalar for constants). TransformerFactory.transform_frame uses
+    it instead of calling the row method once per row.
+    """
+    COLUMN_SUFFIX = "_column"
+
     def __init__(self, row):
         self.row = row
 
     def get_value(self, field_name):
         return getattr(self.row, field_name, "")
+
+    @staticmethod
+    def column(df, field_name, default=""):
+        """
+        Column counterpart of getattr(row, field_name, default) on a RowWrapper
+        row: a missing column gives `default` for every row, blanks give "".
+        """
+        if field_name not in df.columns:
+            return pd.Series(default, index=df.index, dtype=object)
+        values = df[field_name]
+        return values.astype(object).where(values.notna(), "")
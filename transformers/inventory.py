@@ -1,6 +1,7 @@
 from .base import BaseTransformer
 
 class InventoryTransformer(BaseTransformer):
+    # Row methods first; their column versions (see BaseTransformer) follow below
     def get_facility(self):
         return getattr(self.row, 'RWARE#', '').strip()
 
@@ -31,3 +32,42 @@ class InventoryTransformer(BaseTransformer):
     def get_inventory_status(self):
         return 2
 
+    @staticmethod
+    def get_facility_column(df):
+        return BaseTransformer.column(df, 'RWARE#').str.strip()
+
+    @staticmethod
+    def get_inventory_warehouse_column(df):
+        return BaseTransformer.column(df, 'RWARE#').str.strip()
+
+    @staticmethod
+    def get_inventory_lot_number_column(df):
+        return BaseTransformer.column(df, 'LOT#').str.strip()
+
+    @staticmethod
+    def get_inventory_last_receipt_date_column(df):
+        return BaseTransformer.column(df, 'RLRCTD').str.strip()
+
+    @staticmethod
+    def get_country_of_origin_column(df):
+        return "US"
+
+    @staticmethod
+    def get_status_balance_id_column(df):
+        return 2
+
+    @staticmethod
+    def get_weighted_cost_column(df):
+        return BaseTransformer.column(df, 'weightedCost', 0.0)
+
+    @staticmethod
+    def get_inventory_bin_location_column(df):
+        return BaseTransformer.column(df, 'RLOC1').str.strip()
+
+    @staticmethod
+    def get_inventory_quantity_column(df):
+        return BaseTransformer.column(df, "basic_uom_qty", 0.0)
+
+    @staticmethod
+    def get_inventory_status_column(df):
+        return 2
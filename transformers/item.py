@@ -5,6 +5,10 @@ class ItemTransformer(BaseTransformer):
     def get_item_number(self):
         return getattr(self.row, 'itemNumber', '').strip()
 
+    @staticmethod
+    def get_item_number_column(df):
+        return BaseTransformer.column(df, 'itemNumber').str.strip()
+
     def get_item_group(self):
         return getattr(self.row, 'priceClass', '').strip()
 